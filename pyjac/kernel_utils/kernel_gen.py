@@ -6,16 +6,21 @@
 import textwrap
 import os
 import re
+import functools
+import hashlib
 from string import Template
 import logging
-from collections import defaultdict
-import six
-from six.moves import cPickle as pickle
+import weakref
+from itertools import chain
+from collections import defaultdict, OrderedDict
+import pickle
 
 import loopy as lp
 from loopy.types import NumpyType, AtomicNumpyType, to_loopy_type
 from loopy.version import LOOPY_USE_LANGUAGE_VERSION_2018_2  # noqa
 from loopy.kernel.data import AddressSpace as scopes
+from loopy.kernel.array import ArrayBase, FixedStrideArrayDimTag
+from loopy.symbolic import get_dependencies
 try:
     import pyopencl as cl
 except ImportError:
@@ -42,6 +47,16 @@
 
 script_dir = os.path.abspath(os.path.dirname(__file__))
 
+_COMMON_TEMPLATE_DIR = os.path.join(script_dir, 'common')
+"""
+The directory containing the language-independent templates & dependencies
+"""
+
+_LANG_TEMPLATE_DIR = {lang: os.path.join(script_dir, lang) for lang in utils.langs}
+"""
+The directories containing the language-specific templates & dependencies
+"""
+
 
 rhs_work_name = 'rwk'
 """
@@ -59,12 +74,233 @@
 Name of the generated work-array for generic integer work vectors
 """
 
+_work_array_names = frozenset([rhs_work_name, local_work_name, int_work_name])
+"""
+The names of all the generated work-arrays
+"""
+
 time_array = lp.ArrayArg('t', dtype=np.float64, shape=(p_size.name,),
                          address_space=scopes.GLOBAL)
 """
 The time array that we prepend to our function signatures for compatibility
 """
 
+_double_re = re.compile(r'\bdouble\b')
+"""
+Matches the double type, to be replaced by adept's adouble for auto-differentiation
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _load_template(path):
+    """
+    Reads and returns the file at :param:`path` as a :class:`string.Template`.
+    Cached, such that each template is read from disk / parsed only once
+
+    Parameters
+    ----------
+    path: str
+        The path to the template file
+
+    Returns
+    -------
+    template: :class:`string.Template`
+        The loaded template -- the raw string is available via
+        :attr:`string.Template.template`
+    """
+
+    with open(path, 'r') as file:
+        return Template(file.read())
+
+
+@functools.lru_cache(maxsize=None)
+def _split_template(template_str):
+    """
+    Splits the :class:`string.Template` string :param:`template_str` into its
+    literal segments and placeholders, such that repeated substitution into the
+    same template does not need to re-run the placeholder regex
+
+    Parameters
+    ----------
+    template_str: str
+        The template string to split
+
+    Returns
+    -------
+    literals: tuple of str
+        The literal text between placeholders, len(literals) == len(keys) + 1
+    keys: tuple of (str, str)
+        The (name, original text) of each placeholder, in order
+    """
+
+    literals = []
+    keys = []
+    start = 0
+    current = ''
+    for match in Template.pattern.finditer(template_str):
+        current += template_str[start:match.start()]
+        start = match.end()
+        name = match.group('named') or match.group('braced')
+        if name is None:
+            # escaped delimiter, or an invalid placeholder (left as is)
+            current += '$' if match.group('escaped') is not None else \
+                match.group()
+            continue
+        literals.append(current)
+        keys.append((name, match.group()))
+        current = ''
+    literals.append(current + template_str[start:])
+    return tuple(literals), tuple(keys)
+
+
+def _safe_substitute(template_str, **kwargs):
+    """
+    Equivalent to :func:`string.Template.safe_substitute` for
+    :param:`template_str`, using the cached split from :func:`_split_template`
+
+    Parameters
+    ----------
+    template_str: str
+        The template string to substitute into
+    kwargs: dict
+        The placeholder name -> values to substitute
+
+    Returns
+    -------
+    substituted: str
+        The substituted string, any placeholders not in :param:`kwargs` are left
+        unchanged
+    """
+
+    literals, keys = _split_template(template_str)
+    out = [literals[0]]
+    for (name, original), literal in zip(keys, literals[1:]):
+        out.append(str(kwargs[name]) if name in kwargs else original)
+        out.append(literal)
+    return ''.join(out)
+
+
+def _substitute_kernel_body(skeleton, var_name, pre_instructions, instructions,
+                            post_instructions, extra_subs=None):
+    """
+    Substitutes the instructions of a kernel into its :param:`skeleton`
+
+    Parameters
+    ----------
+    skeleton: str
+        The kernel skeleton, containing the ${var_name}, ${pre}, ${main} and
+        ${post} placeholders
+    var_name: str
+        The name of the kernel's loop variable
+    pre_instructions: list of str
+        The instructions to place before the main instructions
+    instructions: list of str
+        The main instructions
+    post_instructions: list of str
+        The instructions to place after the main instructions
+    extra_subs: dict [None]
+        If supplied, any extra substitutions to perform on the complete kernel
+
+    Returns
+    -------
+    kernel_str: str
+        The substituted kernel
+
+    Notes
+    -----
+    The substitution is done in (up to) three passes, each of which resolves
+    one level of '$$' escapes:
+
+        1. ${var_name} is substituted into each set of instructions
+        2. the instructions and ${var_name} are substituted into the skeleton
+        3. if :param:`extra_subs` is non-empty, these are substituted into the
+           complete kernel
+
+    Hence, e.g., '$${key}' in an instruction or the skeleton is replaced by the
+    extra sub 'key' if supplied (and left as '${key}' otherwise), while a
+    literal '$' in the instructions must be escaped as '$$$$' if extra subs are
+    supplied.
+    """
+
+    def subs_preprocess(key, value):
+        # find the instance of ${key} in kernel_str
+        result = utils._find_indent(skeleton, key, value)
+        return Template(result).safe_substitute(var_name=var_name)
+
+    kernel_str = _safe_substitute(
+        skeleton,
+        var_name=var_name,
+        pre=subs_preprocess('${pre}', '\n'.join(pre_instructions)),
+        post=subs_preprocess('${post}', '\n'.join(post_instructions)),
+        main=subs_preprocess('${main}', '\n'.join(instructions)))
+
+    # finally do extra subs
+    if extra_subs:
+        kernel_str = Template(kernel_str).safe_substitute(**extra_subs)
+    return kernel_str
+
+
+def _copy_file(src, dst):
+    """
+    Copies the file at :param:`src` to :param:`dst`, via an in-kernel
+    :func:`os.sendfile` where supported, falling back to :func:`shutil.copyfile`
+
+    Parameters
+    ----------
+    src: str
+        The path to copy from
+    dst: str
+        The path to copy to
+    """
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            size = os.fstat(fsrc.fileno()).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset,
+                                   size - offset)
+                if not sent:
+                    break
+                offset += sent
+            if offset == size:
+                return
+        except (AttributeError, OSError):
+            # no sendfile, or not supported for regular files on this platform
+            pass
+    shutil.copyfile(src, dst)
+
+
+_SKEL = textwrap.dedent(
+    """
+    for j
+        ${pre}
+        for ${var_name}
+            ${main}
+        end
+        ${post}
+    end
+    """)
+"""
+The base skeleton for sub kernel creation
+"""
+
+_SKEL_PRE_SPLIT = textwrap.dedent(
+    """
+    for j_outer
+        for j_inner
+            ${pre}
+            for ${var_name}
+                ${main}
+            end
+            ${post}
+        end
+    end
+    """)
+"""
+The skeleton for sub kernel creation with a pre-split global index
+"""
+
 
 class FakeCall(object):
     """
@@ -122,11 +358,19 @@ class vecwith_fixer(object):
     def __init__(self, clean, vecsize):
         self.clean = clean
         self.vecsize = vecsize
+        # the clean kernel is never modified, hence the grid sizes for a given
+        # set of instructions may be cached
+        self._cache = {}
 
     def __call__(self, insn_ids, ignore_auto=False):
+        key = (frozenset(insn_ids), ignore_auto)
+        try:
+            grid_size, lsize = self._cache[key]
+        except KeyError:
+            grid_size, lsize = self._cache[key] = \
+                self.clean.get_grid_sizes_for_insn_ids(
+                    insn_ids, ignore_auto=ignore_auto)
         # fix for variable too small for vectorization
-        grid_size, lsize = self.clean.get_grid_sizes_for_insn_ids(
-            insn_ids, ignore_auto=ignore_auto)
         lsize = lsize if not bool(self.vecsize) else \
             self.vecsize
         return grid_size, (lsize,)
@@ -147,16 +391,82 @@ def make_kernel_generator(loopy_opts, *args, **kwargs):
     **kwargs : dict
         The keyword args to pass to the :class:`kernel_generator`
     """
-    if loopy_opts.lang == 'c':
-        if not loopy_opts.auto_diff:
-            return c_kernel_generator(loopy_opts, *args, **kwargs)
-        if loopy_opts.auto_diff:
-            return autodiff_kernel_generator(loopy_opts, *args, **kwargs)
-    if loopy_opts.lang == 'opencl':
-        return opencl_kernel_generator(loopy_opts, *args, **kwargs)
-    if loopy_opts.lang == 'ispc':
-        return ispc_kernel_generator(loopy_opts, *args, **kwargs)
-    raise NotImplementedError()
+    try:
+        cls = _generator_dispatch[(loopy_opts.lang, bool(loopy_opts.auto_diff))]
+    except KeyError:
+        raise NotImplementedError()
+    return cls(loopy_opts, *args, **kwargs)
+
+
+def _identity_cached(cache, obj, func):
+    """
+    Returns func(:param:`obj`), cached in :param:`cache` on the identity of the
+    (immutable) :param:`obj`.  Entries are guarded against re-use of the
+    :func:`id` of a since-collected object, and dropped when the object is
+    collected
+
+    Parameters
+    ----------
+    cache: dict
+        The cache to use
+    obj: object
+        The (weak-referenceable) object to key the cache on
+    func: callable
+        The function to evaluate on a cache miss
+
+    Returns
+    -------
+    value: object
+        The (cached) result of func(:param:`obj`)
+    """
+
+    key = id(obj)
+    if key in cache:
+        ref, value = cache[key]
+        if ref() is obj:
+            return value
+
+    def __drop(ref):
+        if key in cache and cache[key][0] is ref:
+            del cache[key]
+
+    value = func(obj)
+    cache[key] = (weakref.ref(obj, __drop), value)
+    return value
+
+
+def _replace_all(text, replacements):
+    """
+    Replaces all occurances of the keys of :param:`replacements` in :param:`text`
+    with the corresponding values, in a single pass over :param:`text`
+
+    Parameters
+    ----------
+    text: str
+        The text to replace in
+    replacements: dict of str -> str
+        The strings to replace, and their replacements
+
+    Returns
+    -------
+    replaced: str
+        The replaced text
+    """
+
+    if len(replacements) == 1:
+        (old, new), = replacements.items()
+        return text.replace(old, new)
+    # longest first, such that no replacement is shadowed by a prefix of itself
+    pattern = re.compile('|'.join(re.escape(x) for x in sorted(
+        replacements, key=len, reverse=True)))
+    return pattern.sub(lambda match: replacements[match.group(0)], text)
+
+
+_io_cache = {}
+"""
+Cache of :func:`find_inputs_and_outputs` results, keyed on the :func:`id` of the
+kernel.  Cleared at the start of every :func:`kernel_generator.generate` call
+"""
 
 
 def find_inputs_and_outputs(knl):
@@ -171,12 +481,46 @@ def find_inputs_and_outputs(knl):
 
     Returns
     -------
-    inputs_and_outputs: set of str
+    inputs_and_outputs: frozenset of str
         The names of the written / read arrays
     """
 
-    return (knl.get_read_variables() | knl.get_written_variables()) & \
-        knl.global_var_names()
+    def __io(knl):
+        return frozenset(knl.get_read_variables() | knl.get_written_variables()) \
+            & frozenset(knl.global_var_names())
+
+    return _identity_cached(_io_cache, knl, __io)
+
+
+def _collect_nonaffine(root):
+    """
+    Returns the set of :class:`tree_node`'s beneath :param:`root` whose path to
+    the :param:`root` crosses a non-affine domain transform (including their own)
+
+    Parameters
+    ----------
+    root: :class:`pyjac.core.array_creator.tree_node`
+        The root of the tree to search
+
+    Returns
+    -------
+    nonaffine: set of :class:`pyjac.core.array_creator.tree_node`
+        The nodes with a non-affine path to the root
+    """
+
+    def __children(node):
+        return [c for c in node.children if isinstance(c, arc.tree_node)]
+
+    nonaffine = set()
+    stack = [(child, False) for child in __children(root)]
+    while stack:
+        node, parent_nonaffine = stack.pop()
+        transform = node.domain_transform
+        bad = parent_nonaffine or (transform is not None and not transform.affine)
+        if bad:
+            nonaffine.add(node)
+        stack.extend((child, bad) for child in __children(node))
+    return nonaffine
 
 
 def _unSIMDable_arrays(knl, loopy_opts, mstore, warn=True):
@@ -210,20 +554,19 @@ def _unSIMDable_arrays(knl, loopy_opts, mstore, warn=True):
 
     # this is test is made quite easy by checking the mapstore's tree
 
-    # first, get all inputs / outputs
-    io = find_inputs_and_outputs(knl)
+    # first, get all inputs / outputs, in a fixed order such that they correspond
+    # one-to-one with the owners found below
+    io = tuple(sorted(find_inputs_and_outputs(knl)))
+    if not io:
+        return []
 
     # check each array
     owners = arc.search_tree(mstore.absolute_root, io)
-    cant_simd = []
-    for ary, owner in zip(io, owners):
-        # see if we can get from the owner to the absolute root without encountering
-        # any non-affine transforms
-        while owner and owner != mstore.absolute_root:
-            if not owner.domain_transform.affine:
-                cant_simd.append(ary)
-                break
-            owner = owner.parent
+    # an array can be vectorized IFF we can get from its owner to the absolute root
+    # without encountering any non-affine transforms
+    nonaffine = frozenset(id(node) for node in _collect_nonaffine(
+        mstore.absolute_root))
+    cant_simd = [ary for ary, owner in zip(io, owners) if id(owner) in nonaffine]
 
     if cant_simd and warn:
         logger = logging.getLogger(__name__)
@@ -302,41 +645,56 @@ def __init__(self, pointer_unpacks=[], instructions=[], preambles=[],
                                  name=name, dependencies=dependencies)
 
 
+_KERNEL_ARG_DOCS = {
+    'phi': ('double', 'The state vector'),
+    'P_arr': ('double', 'The array of pressures.'),
+    'V_arr': ('double', 'The array of volumes'),
+    'dphi': ('double', 'The time rate of change of the state-vector'),
+    'jac': ('double', 'The Jacobian of the time-rate of change of '
+                      'the state vector'),
+    'problem_size': ('size_t', 'The total number of conditions to execute '
+                     'this kernel over')}
+"""
+The (type, description) of the common kernel arguments, see
+:func:`kernel_arg_docs`
+"""
+
+_LANGUAGE_DOCS = {
+    'opencl': {
+        'work_size': ('size_t', 'The number of OpenCL groups to launch.\n'
+                                'If using GPUs, this is the # of CUDA blocks '
+                                'to use.\n'
+                                'If for CPUs, this is the number of logical '
+                                'cores to use.'),
+        'do_not_compile': ('bool', 'If true, the OpenCL kernel has already been '
+                                   'compiled (e.g., via previous kernel call) '
+                                   'and does not need recompilation. False by '
+                                   'default.\n\n Note: If this kernel object '
+                                   'has already been executed, the OpenCL '
+                                   'kernel has been compiled and will not be '
+                                   'recompiled regardless of the status of '
+                                   'this flag.')
+    },
+    'c': {
+        'work_size': ('size_t', 'The number of OpenMP threads to use.'),
+        'do_not_compile': ('bool', 'Unused -- incuded for consistent '
+                           'signatures.')
+    }
+}
+"""
+The (type, description) of the language specific kernel arguments, see
+:func:`langue_docs`
+"""
+
+
 def kernel_arg_docs():
-    return {'phi': ('double', 'The state vector'),
-            'P_arr': ('double', 'The array of pressures.'),
-            'V_arr': ('double', 'The array of volumes'),
-            'dphi': ('double', 'The time rate of change of the state-vector'),
-            'jac': ('double', 'The Jacobian of the time-rate of change of '
-                              'the state vector'),
-            'problem_size': ('size_t', 'The total number of conditions to execute '
-                             'this kernel over')}
+    return _KERNEL_ARG_DOCS.copy()
 
 
 # heh
 def langue_docs(lang):
-    if lang == 'opencl':
-        return {
-            'work_size': ('size_t', 'The number of OpenCL groups to launch.\n'
-                                    'If using GPUs, this is the # of CUDA blocks '
-                                    'to use.\n'
-                                    'If for CPUs, this is the number of logical '
-                                    'cores to use.'),
-            'do_not_compile': ('bool', 'If true, the OpenCL kernel has already been '
-                                       'compiled (e.g., via previous kernel call) '
-                                       'and does not need recompilation. False by '
-                                       'default.\n\n Note: If this kernel object '
-                                       'has already been executed, the OpenCL '
-                                       'kernel has been compiled and will not be '
-                                       'recompiled regardless of the status of '
-                                       'this flag.')
-        }
-    elif lang == 'c':
-        return {
-            'work_size': ('size_t', 'The number of OpenMP threads to use.'),
-            'do_not_compile': ('bool', 'Unused -- incuded for consistent '
-                               'signatures.')
-        }
+    if lang in _LANGUAGE_DOCS:
+        return _LANGUAGE_DOCS[lang].copy()
 
 
 class DocumentingRecord(object):
@@ -473,7 +831,7 @@ def _get_data(self, include_work=False):
         data = {}
 
         def _update(dictv):
-            for key, vals in six.iteritems(dictv):
+            for key, vals in dictv.items():
                 if key in data:
                     vals = [x for x in vals if x not in data[key]]
                     data[key].extend(vals[:])
@@ -578,6 +936,41 @@ class kernel_generator(object):
     The base class for the kernel generators
     """
 
+    _TYPE_MAP = ((np.float64, 'double'),
+                 (np.int32, 'int'),
+                 (np.int64, 'long int'))
+    """
+    The (numpy dtype, ctype) pairs used to build :attr:`type_map`
+    """
+
+    _WORK_ARRAY_CONST_REPLACERS = (
+        (re.compile(r'(double const \*__restrict__ {})'.format(rhs_work_name)),
+         r'double *__restrict__ {}'.format(rhs_work_name)),
+        (re.compile(r'(__local volatile double const \*__restrict__ {})'.format(
+            local_work_name)),
+         r'__local volatile double *__restrict__ {}'.format(local_work_name)),
+        (re.compile(r'(int const \*__restrict__ {})'.format(int_work_name)),
+         r'int *__restrict__ {}'.format(int_work_name)),
+        (re.compile(r'(long int const \*__restrict__ {})'.format(int_work_name)),
+         r'long int *__restrict__ {}'.format(int_work_name)))
+    """
+    The (pattern, replacement) pairs used by :func:`_remove_work_array_consts`
+    """
+
+    _WORK_SIZE_REPLACERS = (
+        # full replacement
+        (re.compile(r'(, int const work_size, )'), r', '),
+        # rhs )
+        (re.compile(r'(, int const work_size\))'), r')'),
+        # lhs (
+        (re.compile(r'(\(int const work_size, )'), r'('),
+        (re.compile(r'(\(work_size, )'), '('),
+        (re.compile(r'(, work_size, )'), ', '),
+        (re.compile(r'(, work_size\))'), ')'))
+    """
+    The (pattern, replacement) pairs used by :func:`_remove_work_size`
+    """
+
     def __init__(self, loopy_opts, kernel_type, kernels,
                  namestore,
                  name=None,
@@ -665,16 +1058,22 @@ def __init__(self, loopy_opts, kernel_type, kernels,
         self.lang = loopy_opts.lang
         self.target = lp_utils.get_target(self.lang, self.loopy_opts.device,
                                           self.compiler)
+        # cache of (dtype, for_atomic) -> targeted dtype, see :func:`_with_target`
+        self._target_dtypes = {}
+        # caches of the work-size fixed kernels / generated code for our kernels,
+        # see :func:`_merge_kernels`
+        self._fixed_kernels = {}
+        self._generated_code = {}
         self.mem_limits = mem_limits
 
-        # Used for pinned memory kernels to enable splitting evaluation over multiple
-        # kernel calls
-        self.arg_name_maps = {p_size: 'per_run'}
-
         self.kernel_type = kernel_type
         self._name = name
         if name is not None:
             assert self.kernel_type == KernelType.dummy
+        # the kernel type is fixed at construction, hence we can resolve the name
+        # once rather than on every access
+        self._name_cached = name if kernel_type == KernelType.dummy else \
+            utils.enum_to_string(kernel_type)
         self.kernels = kernels
         self.namestore = namestore
         self.test_size = test_size
@@ -684,37 +1083,44 @@ def __init__(self, loopy_opts, kernel_type, kernels,
         self.in_arrays = input_arrays[:]
         self.out_arrays = output_arrays
 
-        self.type_map = {}
-        self.type_map[to_loopy_type(np.float64, target=self.target)] = 'double'
-        self.type_map[to_loopy_type(np.int32, target=self.target)] = 'int'
-        self.type_map[to_loopy_type(np.int64, target=self.target)] = 'long int'
-
-        self.depends_on = depends_on[:]
-        self.array_props = array_props.copy()
+        # note: the keys must carry our target for pickling, hence we can't share a
+        # single mapping between generators
+        self.type_map = {to_loopy_type(dtype, target=self.target): ctype
+                         for dtype, ctype in self._TYPE_MAP}
+
+        # note: the following lists are shared with the caller, and are never
+        # modified in place -- any additions re-bind the attribute to a new list
+        # (copy-on-write) such that the caller's lists are left untouched
+        self.depends_on = depends_on
+        # set once our own kernels (and those of our dependencies) are built
+        self._kernels_built = False
+        self.array_props = array_props
         self.all_arrays = []
-        self.barriers = barriers[:]
+        self.barriers = barriers
 
         # extra kernel parameters to be added to subkernels
-        self.extra_kernel_data = extra_kernel_data[:]
+        self.extra_kernel_data = extra_kernel_data
         # extra kernel parameters to be added only to this subkernel
-        self.extra_global_kernel_data = extra_global_kernel_data[:]
+        self.extra_global_kernel_data = extra_global_kernel_data
 
-        self.extra_preambles = extra_preambles[:]
+        self.extra_preambles = extra_preambles
         # check for Jacobian type
         self.jacobian_lookup = None
         if isinstance(namestore.jac, arc.jac_creator):
             # need to add the row / column inds
-            self.extra_kernel_data.extend([self.namestore.jac_row_inds([''])[0],
-                                           self.namestore.jac_col_inds([''])[0]])
+            self.extra_kernel_data = self.extra_kernel_data + [
+                self.namestore.jac_row_inds([''])[0],
+                self.namestore.jac_col_inds([''])[0]]
 
             # and the preamble
-            self.extra_preambles.append(lp_pregen.jac_indirect_lookup(
-                self.namestore.jac_col_inds if self.loopy_opts.order == 'C'
-                else self.namestore.jac_row_inds, self.target))
+            self.extra_preambles = self.extra_preambles + [
+                lp_pregen.jac_indirect_lookup(
+                    self.namestore.jac_col_inds if self.loopy_opts.order == 'C'
+                    else self.namestore.jac_row_inds, self.target)]
             self.jacobian_lookup = self.extra_preambles[-1].array.name
 
         # calls smuggled past loopy
-        self.fake_calls = fake_calls[:]
+        self.fake_calls = fake_calls
         # set testing
         self.for_testing = isinstance(test_size, int)
         # setup driver type
@@ -726,37 +1132,21 @@ def __init__(self, loopy_opts, kernel_type, kernels,
         # validation
         self.for_validation = False
 
-        def __mark(dep):
-            for x in dep.depends_on:
-                x.owner = dep
-                __mark(x)
-        __mark(self)
+        # walk the dependency graph iteratively, marking each generator only once
+        # (guards against diamond dependencies & deep graphs)
+        stack = [self]
+        seen = set([id(self)])
+        while stack:
+            node = stack.pop()
+            for x in node.depends_on:
+                if id(x) in seen:
+                    continue
+                seen.add(id(x))
+                x.owner = node
+                stack.append(x)
 
         # the base skeleton for sub kernel creation
-        self.skeleton = textwrap.dedent(
-            """
-            for j
-                ${pre}
-                for ${var_name}
-                    ${main}
-                end
-                ${post}
-            end
-            """)
-        if self.loopy_opts.pre_split:
-            # pre split skeleton
-            self.skeleton = textwrap.dedent(
-                """
-                for j_outer
-                    for j_inner
-                        ${pre}
-                        for ${var_name}
-                            ${main}
-                        end
-                        ${post}
-                    end
-                end
-                """)
+        self.skeleton = _SKEL_PRE_SPLIT if self.loopy_opts.pre_split else _SKEL
 
     @property
     def name(self):
@@ -764,9 +1154,28 @@ def name(self):
         Return the name of this kernel generator, based on :attr:`kernel_type
         """
 
-        if self.kernel_type == KernelType.dummy:
-            return self._name
-        return utils.enum_to_string(self.kernel_type)
+        return self._name_cached
+
+    @property
+    def extra_kernel_data(self):
+        """
+        The extra kernel parameters to be added to subkernels
+        """
+        return self._extra_kernel_data
+
+    @extra_kernel_data.setter
+    def extra_kernel_data(self, value):
+        """
+        Sets the :attr:`extra_kernel_data`, and partitions it into the kernel
+        arguments & (non-private) temporary variables used during code-generation
+        """
+        self._extra_kernel_data = value
+        self._extra_kernel_args = [x for x in value if isinstance(
+            x, lp.KernelArgument)]
+        self._extra_kernel_temps = [x for x in value if isinstance(
+            x, lp.TemporaryVariable) and
+            x.address_space != scopes.PRIVATE and
+            x.address_space != lp.auto]
 
     @property
     def unique_pointers(self):
@@ -786,6 +1195,20 @@ def work_size(self):
             return self.vec_width if self.vec_width else 1
         return w_size.name
 
+    @property
+    def _file_ext(self):
+        """
+        The source file extension for this generator's language
+        """
+        return utils.file_ext[self.lang]
+
+    @property
+    def _header_ext(self):
+        """
+        The header file extension for this generator's language
+        """
+        return utils.header_ext[self.lang]
+
     @property
     def target_preambles(self):
         """
@@ -942,7 +1365,9 @@ def add_depencencies(self, k_gens):
             The dependencies to add to this kernel
         """
 
-        self.depends_on.extend(k_gens)
+        self.depends_on = self.depends_on + list(k_gens)
+        # the new dependencies must be built
+        self._kernels_built = False
 
     def _with_target(self, kernel_arg, for_atomic=False):
         """
@@ -962,9 +1387,14 @@ def _with_target(self, kernel_arg, for_atomic=False):
             The argument with correct target set in the dtype
         """
 
-        return kernel_arg.copy(
-            dtype=to_loopy_type(kernel_arg.dtype, for_atomic=for_atomic,
-                                target=self.target).with_target(self.target))
+        key = (kernel_arg.dtype, for_atomic)
+        try:
+            dtype = self._target_dtypes[key]
+        except KeyError:
+            dtype = self._target_dtypes[key] = to_loopy_type(
+                kernel_arg.dtype, for_atomic=for_atomic,
+                target=self.target).with_target(self.target)
+        return kernel_arg.copy(dtype=dtype)
 
     def _make_kernels(self, kernels=[], **kwargs):
         """
@@ -982,6 +1412,10 @@ def _make_kernels(self, kernels=[], **kwargs):
 
         use_ours = False
         if not kernels:
+            if self._kernels_built:
+                # a shared dependency that has already been built, avoid
+                # re-walking its own dependency graph
+                return self.kernels
             use_ours = True
             kernels = self.kernels
 
@@ -1018,9 +1452,10 @@ def _make_kernels(self, kernels=[], **kwargs):
             kernels[i] = lp_utils.set_editor(kernels[i])
 
         # need to call make_kernels on dependencies
-        for x in self.depends_on:
-            if use_ours:
+        if use_ours:
+            for x in self.depends_on:
                 x._make_kernels()
+            self._kernels_built = True
 
         return kernels
 
@@ -1042,17 +1477,17 @@ def __copy_deps(self, scan_path, out_path, change_extension=True):
 
         """
 
+        c_header_ext = utils.header_ext['c']
         deps = [x for x in os.listdir(scan_path) if os.path.isfile(
             os.path.join(scan_path, x)) and not x.endswith('.in')]
         for dep in deps:
             dep_dest = dep
-            dep_is_header = dep.endswith(utils.header_ext['c'])
-            ext = (utils.file_ext[self.lang] if not dep_is_header
-                   else utils.header_ext[self.lang])
+            ext = self._header_ext if dep.endswith(c_header_ext) else \
+                self._file_ext
             if change_extension and not dep.endswith(ext):
-                dep_dest = dep[:dep.rfind('.')] + ext
-            shutil.copyfile(os.path.join(scan_path, dep),
-                            os.path.join(out_path, dep_dest))
+                dep_dest = dep.rpartition('.')[0] + ext
+            _copy_file(os.path.join(scan_path, dep),
+                       os.path.join(out_path, dep_dest))
 
     def order_kernel_args(self, args):
         """
@@ -1094,6 +1529,7 @@ def generate(self, path, data_order=None, data_filename='data.bin',
 
         self.for_validation = for_validation
         utils.create_dir(path)
+        _io_cache.clear()
         self._make_kernels()
         callgen, record, result = self._generate_wrapping_kernel(path)
         callgen = self._generate_driver_kernel(path, record, result, callgen)
@@ -1105,8 +1541,10 @@ def generate(self, path, data_order=None, data_filename='data.bin',
         self._generate_common(path, record)
 
         # finally, copy any dependencies to the path
-        lang_dir = os.path.join(script_dir, self.lang)
+        lang_dir = _LANG_TEMPLATE_DIR[self.lang]
         self.__copy_deps(lang_dir, path, change_extension=False)
+        # and hash the complete set of generated sources
+        self._generate_source_hash(path)
 
     def _generate_common(self, path, record):
         """
@@ -1125,7 +1563,8 @@ def _generate_common(self, path, record):
         None
         """
 
-        inputs = [x for x in record.args if x.name in self.in_arrays]
+        in_names = set(self.in_arrays)
+        inputs = [x for x in record.args if x.name in in_names]
 
         # create readgen
         readgen = ReadgenRecord(
@@ -1151,16 +1590,15 @@ def run(input, output):
                              ' {}'.format(output))
                 raise
 
-        common = os.path.join(script_dir, 'common')
+        common = _COMMON_TEMPLATE_DIR
         # generate reader
         infile = os.path.join(common, 'read_initial_conditions.cpp.in')
-        outfile = os.path.join(path, 'read_initial_conditions' +
-                               utils.file_ext[self.lang])
+        outfile = os.path.join(path, 'read_initial_conditions' + self._file_ext)
         run(infile, outfile)
         # generate header
         infile = os.path.join(common, 'read_initial_conditions.hpp.in')
         outfile = os.path.join(path, 'read_initial_conditions' +
-                               utils.header_ext[self.lang])
+                               self._header_ext)
         run(infile, outfile)
 
         # and any other deps
@@ -1188,9 +1626,8 @@ def _generate_calling_header(self, path, callgen):
         with open(callout, 'wb') as file:
             pickle.dump(callgen, file)
 
-        infile = os.path.join(script_dir, 'common', 'kernel.hpp.in')
-        filename = os.path.join(path, self.name + '_main' + utils.header_ext[
-                self.lang])
+        infile = os.path.join(_COMMON_TEMPLATE_DIR, 'kernel.hpp.in')
+        filename = os.path.join(path, self.name + '_main' + self._header_ext)
 
         # cogify
         try:
@@ -1225,7 +1662,8 @@ def _special_kernel_subs(self, path, callgen):
         return callgen
 
     def _set_sort(self, arr):
-        return sorted(set(arr), key=lambda x: arr.index(x))
+        # ordered de-duplication, preserving first appearance
+        return list(OrderedDict.fromkeys(arr))
 
     def _generate_calling_program(self, path, data_filename, callgen, record,
                                   for_validation=False, species_names=[],
@@ -1289,9 +1727,8 @@ def _generate_calling_program(self, path, data_filename, callgen, record,
         with open(callout, 'wb') as file:
             pickle.dump(callgen, file)
 
-        infile = os.path.join(script_dir, 'common', 'kernel.cpp.in')
-        filename = os.path.join(path, self.name + '_main' + utils.file_ext[
-                self.lang])
+        infile = os.path.join(_COMMON_TEMPLATE_DIR, 'kernel.cpp.in')
+        filename = os.path.join(path, self.name + '_main' + self._file_ext)
 
         # cogify
         try:
@@ -1325,6 +1762,24 @@ def _generate_compiling_program(self, path, callgen):
 
         return callgen
 
+    def _generate_source_hash(self, path):
+        """
+        Needed for some languages (e.g., OpenCL) this may be overriden in
+        subclasses to store a hash of the generated sources, such that an
+        up-to-date compiled kernel need not be rebuilt
+
+        Parameters
+        ----------
+        path : str
+            The output path the sources were written to
+
+        Returns
+        -------
+        None
+        """
+
+        pass
+
     @classmethod
     def _temporary_to_arg(cls, temp):
         """
@@ -1333,10 +1788,8 @@ def _temporary_to_arg(cls, temp):
         """
 
         assert isinstance(temp, lp.TemporaryVariable)
-        return lp.ArrayArg(
-            address_space=scopes.LOCAL,
-            **{k: v for k, v in six.iteritems(vars(temp))
-               if k in ['name', 'shape', 'dtype', 'dim_tags']})
+        return lp.ArrayArg(name=temp.name, shape=temp.shape, dtype=temp.dtype,
+                           dim_tags=temp.dim_tags, address_space=scopes.LOCAL)
 
     def _migrate_locals(self, kernel, ldecls):
         """
@@ -1367,8 +1820,8 @@ def _migrate_locals(self, kernel, ldecls):
         return kernel.copy(
             args=kernel.args[:] + [self._temporary_to_arg(x) for x in ldecls],
             temporary_variables={
-                key: val for key, val in six.iteritems(kernel.temporary_variables)
-                if not set([key]) & names})
+                key: val for key, val in kernel.temporary_variables.items()
+                if key not in names})
 
     def __get_kernel_defn(self, knl, passed_locals=[], remove_work_const=False):
         """
@@ -1437,8 +1890,8 @@ def _get_kernel_call(self, knl=None, passed_locals=[]):
         # default is the generated kernel
         if knl is None:
             args = self.kernel_data + [
-                x for x in self.extra_global_kernel_data + self.extra_kernel_data
-                if isinstance(x, lp.KernelArgument)]
+                x for x in self.extra_global_kernel_data
+                if isinstance(x, lp.KernelArgument)] + self._extra_kernel_args
             if passed_locals:
                 # put a dummy object that we can reference the name of in the
                 # arguements
@@ -1448,16 +1901,13 @@ def _get_kernel_call(self, knl=None, passed_locals=[]):
         else:
             # otherwise used passed kernel
             if passed_locals:
-                knl = self.__migrate_locals(knl, passed_locals)
+                knl = self._migrate_locals(knl, passed_locals)
             args = knl.args
             name = knl.name
 
         args = [x.name for x in args]
 
-        return Template("${name}(${args});\n").substitute(
-            name=name,
-            args=', '.join(args)
-            )
+        return '{name}({args});\n'.format(name=name, args=', '.join(args))
 
     def _compare_args(self, arg1, arg2, allow_shape_mismatch=False):
         """
@@ -1467,17 +1917,14 @@ def _compare_args(self, arg1, arg2, allow_shape_mismatch=False):
         their atomicity
         """
 
-        def __atomify(arg):
-            return self._with_target(arg, for_atomic=True)
-
-        def __shapify(arg1, arg2):
-            a1 = self._with_target(arg1, for_atomic=True)
-            a2 = self._with_target(arg2, for_atomic=True)
-            a1 = a1.copy(shape=a2.shape, dim_tags=a2.dim_tags)
-            return a1 == a2
+        if arg1 == arg2:
+            return True
 
-        return arg1 == arg2 or (__atomify(arg1) == __atomify(arg2)) or (
-            allow_shape_mismatch and __shapify(arg1, arg2))
+        # atomify each argument only once
+        a1 = self._with_target(arg1, for_atomic=True)
+        a2 = self._with_target(arg2, for_atomic=True)
+        return a1 == a2 or (allow_shape_mismatch and a1.copy(
+            shape=a2.shape, dim_tags=a2.dim_tags) == a2)
 
     def _process_args(self, kernels=[], allowed_conflicts=[]):
         """
@@ -1516,21 +1963,33 @@ def _process_args(self, kernels=[], allowed_conflicts=[]):
         if not kernels:
             kernels = self.kernels[:]
 
-        # find complete list of kernel data
-        args = [arg for dummy in kernels for arg in dummy.args]
+        # find complete list of kernel data, grouped by name (dropping exact
+        # duplicates), along with the written / array argument names in a single
+        # pass over the kernels
+        groups = OrderedDict()
+        written = set()
+        array_names = set()
+
+        def __add(x):
+            same_name = groups.setdefault(x.name, [])
+            if not any(x == y for y in same_name):
+                same_name.append(x)
+
+        for dummy in kernels:
+            written.update(dummy.get_written_variables())
+            for arg in dummy.args:
+                __add(arg)
+                if not isinstance(arg, lp.ValueArg):
+                    array_names.add(arg.name)
 
         # add our additional kernel data, if any
-        args.extend([x for x in self.extra_kernel_data if isinstance(
-            x, lp.KernelArgument)])
+        for arg in self._extra_kernel_args:
+            __add(arg)
 
         kernel_data = []
-        # now, scan the arguments for duplicates
-        nameset = sorted(set(d.name for d in args))
-        for name in nameset:
-            same_name = []
-            for x in args:
-                if x.name == name and not any(x == y for y in same_name):
-                    same_name.append(x)
+        # now, scan each group for conflicts
+        for name in sorted(groups):
+            same_name = groups[name]
 
             def __raise():
                 raise Exception('Cannot resolve different arguements of '
@@ -1585,12 +2044,9 @@ def __raise():
         valueargs, args = utils.partition(
             kernel_data, lambda x: isinstance(x, lp.ValueArg))
 
-        # get list of arguments on readonly
-        readonly = set(
-                arg.name for dummy in kernels for arg in dummy.args
-                if not any(arg.name in d.get_written_variables()
-                           for d in kernels)
-                and not isinstance(arg, lp.ValueArg))
+        # get list of arguments on readonly (note: resolving atomics above doesn't
+        # change argument names or types)
+        readonly = array_names - written
 
         # check (non-private) temporary variable duplicates
         temps = [arg for dummy in kernels
@@ -1599,14 +2055,13 @@ def __raise():
                  arg.address_space != scopes.PRIVATE and
                  arg.address_space != lp.auto]
         # and add extra kernel data, if any
-        temps.extend([x for x in self.extra_kernel_data if isinstance(
-            x, lp.TemporaryVariable) and
-            x.address_space != scopes.PRIVATE and
-            x.address_space != lp.auto])
-        copy = temps[:]
+        temps.extend(self._extra_kernel_temps)
+        groups = OrderedDict()
+        for x in temps:
+            groups.setdefault(x.name, []).append(x)
         temps = []
-        for name in sorted(set(x.name for x in copy)):
-            same_names = [x for x in copy if x.name == name]
+        for name in sorted(groups):
+            same_names = groups[name]
             if len(same_names) > 1:
                 if not all(x == same_names[0] for x in same_names[1:]):
                     raise Exception('Cannot resolve different arguments of '
@@ -1695,33 +2150,36 @@ def _process_memory(self, record):
             gtemps = constants[:]
             if self.jacobian_lookup:
                 gtemps = [x for x in constants if self.jacobian_lookup not in x.name]
-            # sort by largest size
+            # sort by largest size, and migrate in that order
             gtemps = sorted(gtemps, key=lambda x: np.prod(x.shape), reverse=True)
             type_changes[memory_type.m_global].append(gtemps[0])
-            gtemps = gtemps[1:]
+            i = 1
             while not all(x >= 0 for x in mem_limits.can_fit(
                     with_type_changes=type_changes)):
-                if not gtemps:
+                if i >= len(gtemps):
                     logger = logging.getLogger(__name__)
                     logger.exception('Cannot fit kernel {} in memory'.format(
                         self.name))
                     # should never get here, but still...
                     raise Exception()
 
-                type_changes[memory_type.m_global].append(gtemps[0])
-                gtemps = gtemps[1:]
+                type_changes[memory_type.m_global].append(gtemps[i])
+                i += 1
 
             # once we've converted enough, we need to physically change the types
-            for x in [v for arrs in type_changes.values() for v in arrs]:
-                args.append(
-                    self._with_target(
-                        lp.GlobalArg(x.name, dtype=x.dtype, shape=x.shape)))
-                readonly.add(args[-1].name)
-                host_constants.append(x)
-
-                # and update the types
-                mem_types[memory_type.m_constant].remove(x)
-                mem_types[memory_type.m_global].append(x)
+            migrated = [v for arrs in type_changes.values() for v in arrs]
+            args.extend([self._with_target(
+                lp.GlobalArg(x.name, dtype=x.dtype, shape=x.shape))
+                for x in migrated])
+            readonly.update(x.name for x in migrated)
+            host_constants.extend(migrated)
+
+            # and update the types
+            migrated_ids = set(id(x) for x in migrated)
+            mem_types[memory_type.m_constant] = [
+                x for x in mem_types[memory_type.m_constant]
+                if id(x) not in migrated_ids]
+            mem_types[memory_type.m_global].extend(migrated)
 
             mem_limits = memory_limits.get_limits(
                 self.loopy_opts, mem_types, string_strides=get_string_strides()[0],
@@ -1762,13 +2220,13 @@ def _compress_to_working_buffer(self, record, for_driver=False):
 
         if record.host_constants:
             # include host constants in integer/double workspaces
-            inames = set([i.name for i in iargs])
-            dnames = set([d.name for d in dargs])
+            inames = set(i.name for i in iargs)
+            dnames = set(d.name for d in dargs)
             for hc in record.host_constants:
-                if hc.dtype == itype and not set([hc.name]) & inames:
-                    iargs += [hc]
-                elif not set([hc.name]) & dnames:
-                    dargs += [hc]
+                if hc.dtype == itype and hc.name not in inames:
+                    iargs.append(hc)
+                elif hc.name not in dnames:
+                    dargs.append(hc)
 
         # and create buffers for all
         assert dargs, 'No kernel data!'
@@ -1792,11 +2250,9 @@ def __generate(args, name, scope=scopes.GLOBAL, result=None):
 
             # get the pointer unpackings
             size_per_wi, static, offsets = self._get_working_buffer(args)
-            unpacks = []
-            for k, (dtype, size, offset, s) in six.iteritems(offsets):
-                assert s == scope
-                unpacks.append(self._get_pointer_unpack(
-                    k, size, offset, dtype, scope))
+            assert all(s == scope for _, _, _, s in offsets.values())
+            unpacks = [self._get_pointer_unpack(k, size, offset, dtype, scope)
+                       for k, (dtype, size, offset, _) in offsets.items()]
             if not result:
                 result = CodegenResult(pointer_unpacks=unpacks,
                                        pointer_offsets=offsets)
@@ -1858,14 +2314,16 @@ def _specialize_pointers(self, record, result):
         """
 
         args = set(self.in_arrays + self.out_arrays)
-        data = set([x.name for x in record.args] + [x.name for x in record.local])
+        args_by_name = record.args_by_name
+        local_by_name = record.by_name('local')
 
         unpacks = []
         offsets = {}
 
-        for (arry, offset), unpack in zip(*(six.iteritems(result.pointer_offsets),
+        for (arry, offset), unpack in zip(*(result.pointer_offsets.items(),
                                             result.pointer_unpacks)):
-            if (arry not in args) and (arry in data):
+            if (arry not in args) and (arry in args_by_name or
+                                       arry in local_by_name):
                 offsets[arry] = offset
                 unpacks.append(unpack)
 
@@ -1894,12 +2352,19 @@ def _dummy_wrapper_kernel(self, kernel_data, readonly, vec_width,
 
         """
 
+        readonly = set(readonly)
+        # zero-indicies, by number of dimensions
+        zero_inds = {}
+
         # assign to non-readonly to prevent removal
         def _name_assign(arr, use_atomics=True):
             if arr.name not in readonly and not isinstance(arr, lp.ValueArg) and \
-                    arr.name not in [time_array.name]:
+                    arr.name != time_array.name:
+                ndim = len(arr.shape)
+                if ndim not in zero_inds:
+                    zero_inds[ndim] = ', '.join(['0'] * ndim)
                 return arr.name + '[{ind}] = 0 {atomic}'.format(
-                    ind=', '.join(['0'] * len(arr.shape)),
+                    ind=zero_inds[ndim],
                     atomic='{atomic}'
                            if isinstance(arr.dtype, AtomicNumpyType) and use_atomics
                            else '')
@@ -1909,8 +2374,7 @@ def _name_assign(arr, use_atomics=True):
         kdata = self.order_kernel_args(kernel_data[:])
         if as_dummy_call:
             # add extra kernel args
-            kdata.extend([x for x in self.extra_kernel_data
-                          if isinstance(x, lp.KernelArgument)])
+            kdata.extend(self._extra_kernel_args)
         insns = '\n'.join(_name_assign(arr) for arr in kdata)
 
         # name
@@ -1955,13 +2419,14 @@ def _migrate_host_constants(self, kernels, host_constants):
             # need to transfer these to arguments
             if transferred:
                 # filter temporaries
-                new_temps = {t: v for t, v in six.iteritems(
-                             kernels[i].temporary_variables) if t not in transferred}
+                new_temps = {t: v for t, v in
+                             kernels[i].temporary_variables.items()
+                             if t not in transferred}
                 # create new args
                 new_args = [self._with_target(lp.GlobalArg(
                     t, shape=v.shape, dtype=v.dtype, order=v.order,
                     dim_tags=v.dim_tags))
-                    for t, v in six.iteritems(kernels[i].temporary_variables)
+                    for t, v in kernels[i].temporary_variables.items()
                     if t in transferred]
                 kernels[i] = kernels[i].copy(
                     args=kernels[i].args + new_args, temporary_variables=new_temps)
@@ -2010,7 +2475,7 @@ def _get_size(ssize):
         mapping = {}
         if self.unique_pointers:
             mapping = {v.name: v
-                       for k, v in six.iteritems(vars(self.namestore))
+                       for k, v in vars(self.namestore).items()
                        if isinstance(v, arc.creator)}
 
         def _offset():
@@ -2104,17 +2569,7 @@ def _remove_work_array_consts(cls, text):
         the kernel in question doesn't write to it in loopy.
         """
 
-        replacers = [(
-            re.compile(r'(double const \*__restrict__ {})'.format(rhs_work_name)),
-            r'double *__restrict__ {}'.format(rhs_work_name)), (
-            re.compile(r'(__local volatile double const \*__restrict__ {})'.format(
-                local_work_name)),
-            r'__local volatile double *__restrict__ {}'.format(local_work_name)), (
-            re.compile(r'(int const \*__restrict__ {})'.format(int_work_name)),
-            r'int *__restrict__ {}'.format(int_work_name)), (
-            re.compile(r'(long int const \*__restrict__ {})'.format(int_work_name)),
-            r'long int *__restrict__ {}'.format(int_work_name))]
-        for r, s in replacers:
+        for r, s in cls._WORK_ARRAY_CONST_REPLACERS:
             text = r.sub(s, text)
         return text
 
@@ -2137,16 +2592,7 @@ def _remove_work_size(cls, text):
         Hack -- TODO: whip up define-based array sizing for loopy
         """
 
-        replacers = [  # full replacement
-                     (re.compile(r'(, int const work_size, )'), r', '),
-                     # rhs )
-                     (re.compile(r'(, int const work_size\))'), r')'),
-                     # lhs (
-                     (re.compile(r'(\(int const work_size, )'), r'('),
-                     (re.compile(r'(\(work_size, )'), '('),
-                     (re.compile(r'(, work_size, )'), ', '),
-                     (re.compile(r'(, work_size\))'), ')')]
-        for r, s in replacers:
+        for r, s in cls._WORK_SIZE_REPLACERS:
             text = r.sub(s, text)
         return text
 
@@ -2207,6 +2653,8 @@ def _merge_kernels(self, record, result, kernels=[], fake_calls={},
 
         # generate the kernel code
         preambles = []
+        # set of the preambles above, for de-duplication
+        preamble_set = set()
         extra_kernels = []
         inits = {}
         instructions = []
@@ -2216,45 +2664,87 @@ def _merge_kernels(self, record, result, kernels=[], fake_calls={},
         owner = self._get_kernel_ownership()
         deps = self._get_deps(include_self=True)
 
-        def _get_func_body(cgr, subs={}):
+        def _get_func_body(cgr, subs=None):
             """
             Returns the function declaration w/o initializers or preambles
             from a :class:`loopy.GeneratedProgram`
             """
-            # get body
+            # get body -- only the function body itself need be serialized
             if isinstance(cgr.ast, cgen.FunctionBody):
                 body = str(cgr.ast)
             else:
                 body = str(cgr.ast.contents[-1])
 
             # apply any substitutions
-            for k, v in six.iteritems(subs):
-                body = body.replace(k, v)
+            if subs:
+                for k, v in subs.items():
+                    body = body.replace(k, v)
 
             # feed through get_code to get any corrections
             return lp_utils.get_code(body, self.loopy_opts)
 
+        readonly = frozenset(record.readonly)
+
+        def _check_name(decl):
+            """
+            Returns the name of the (possibly nested) declaration :param:`decl`, and
+            whether it is a migrated constant
+            """
+            while decl is not None:
+                name = getattr(decl, 'name', None)
+                if name is not None:
+                    return name, name in readonly
+                decl = getattr(decl, 'subdecl', None)
+            return '', False
+
+        def _fix_work_size(knl):
+            return lp.fix_parameters(knl, **{w_size.name: 1})
+
+        # loop invariants
+        fix_work_size = self.lang == 'c'
+        remove_work_size = self._remove_work_size
+        remove_work_array_consts = self._remove_work_array_consts
+        # kernel calls may be requested both for the kernel itself and for fake
+        # calls referring back to it, hence cache the (work-size removed) calls
+        call_cache = {}
+
+        def get_kernel_call(knl, passed_locals=[]):
+            key = (id(knl), tuple(str(x) for x in passed_locals))
+            if key not in call_cache:
+                call_cache[key] = (knl, remove_work_size(self._get_kernel_call(
+                    knl=knl, passed_locals=passed_locals)))
+            return call_cache[key][1]
+
+        # fake calls match on the name of the kernel they are placed in
+        fake_calls_by_name = defaultdict(list)
+        for fc in fake_calls:
+            fake_calls_by_name[fc.replace_in.name].append(fc)
+
         # split into bodies, preambles, etc.
         for i, k, in enumerate(kernels):
             # todo: hack -- until we have a proper OpenMP target in Loopy, we
             # need to set the inner work-size dimension to 1
             # (to avoid an explicit work-size loop)
-            if self.lang == 'c':
-                k = lp.fix_parameters(k, **{w_size.name: 1})
+            if fix_work_size:
+                k = _identity_cached(self._fixed_kernels, k, _fix_work_size)
 
             # drivers own all their own kernels
-            i_own = for_driver or (k.name in owner and owner[k.name] == self)
-            dep_own = for_driver or (k.name in owner and owner[k.name] in deps)
+            k_owner = owner.get(k.name)
+            i_own = for_driver or (k_owner is not None and k_owner == self)
+            dep_own = for_driver or (k_owner is not None and k_owner in deps)
             # make kernel
             cgr = None
             dp = None
             if i_own:
                 # only generate code for kernels we actually own to avoid duplication
-                cgr = lp.generate_code_v2(k)
+                # the kernels are immutable, so the generated code may be reused
+                # across wrapper / driver generation and repeated generate calls
+                cgr = _identity_cached(self._generated_code, k, lp.generate_code_v2)
                 # grab preambles
                 for _, preamble in cgr.device_preambles:
                     preamble = textwrap.dedent(preamble)
-                    if preamble and preamble not in preambles:
+                    if preamble and preamble not in preamble_set:
+                        preamble_set.add(preamble)
                         preambles.append(preamble)
 
                 # now scan device program
@@ -2267,14 +2757,8 @@ def _get_func_body(cgr, subs={}):
                 for item in dp.ast.contents:
                     # initializers go in the preamble
                     if isinstance(item, cgen.Initializer):
-                        def _rec_check_name(decl):
-                            if 'name' in vars(decl):
-                                return decl.name, decl.name in record.readonly
-                            elif 'subdecl' in vars(decl):
-                                return _rec_check_name(decl.subdecl)
-                            return '', False
                         # check for migrated constant
-                        name, const = _rec_check_name(item.vdecl)
+                        name, const = _check_name(item.vdecl)
                         if const:
                             continue
                         if name not in init_list:
@@ -2296,26 +2780,29 @@ def _rec_check_name(decl):
 
             if i_own:
                 # only place the kernel defn in this file, IFF we own it
-                extra = self._remove_work_array_consts(
-                    self._remove_work_size(_get_func_body(dp, {})))
+                extra = remove_work_array_consts(
+                    remove_work_size(_get_func_body(dp)))
+                # check to see if this kernel has any fake calls to replace
+                fks = [fk for fk in fake_calls_by_name.get(k.name, [])
+                       if fk.match(k, extra)]
+                if fks:
+                    # replace calls in instructions to call to kernel
+                    replacements = {}
+                    for fk in fks:
+                        knl_call = get_kernel_call(
+                            fk.replace_with, passed_locals=local_decls)
+                        replacements[fk.dummy_call] = knl_call[:-2]
+                    extra = _replace_all(extra, replacements)
                 extra_kernels.append(extra)
-                if fake_calls:
-                    # check to see if this kernel has a fake call to replace
-                    fk = next((x for x in fake_calls if x.match(k, extra)), None)
-                    if fk:
-                        # replace call in instructions to call to kernel
-                        knl_call = self._remove_work_size(self._get_kernel_call(
-                            knl=fk.replace_with, passed_locals=local_decls))
-                        extra_kernels[-1] = extra_kernels[-1].replace(
-                            fk.dummy_call, knl_call[:-2])
                 # and add defn to preamble
-                preambles += [self._remove_work_array_consts(
-                    self._remove_work_size(
-                        lp_utils.get_header(k, codegen_result=cgr)))]
+                header = remove_work_array_consts(remove_work_size(
+                    lp_utils.get_header(k, codegen_result=cgr)))
+                preamble_set.add(header)
+                preambles.append(textwrap.dedent(header))
 
             # get instructions
             if i_own or dep_own:
-                insns = self._remove_work_size(self._get_kernel_call(k))
+                insns = get_kernel_call(k)
                 instructions.append(insns)
 
         # determine vector width
@@ -2334,18 +2821,17 @@ def _rec_check_name(decl):
         if not for_driver:
             instructions = self.apply_barriers(instructions)
 
-        # add pointer unpacking
+        # add local declarations, and pointer unpacking to the beginning of the
+        # instructions -- the driver places unpacks outside of loops
+        header = [str(x) for x in local_decls]
         if not for_driver:
-            # driver places unpacks outside of loops
-            instructions[0:0] = result.pointer_unpacks[:]
-
-        # add local declaration to beginning of instructions
-        instructions[0:0] = [str(x) for x in local_decls]
+            header.extend(result.pointer_unpacks)
+        instructions = header + instructions
 
         # add any target preambles
-        preambles = [x for x in self.target_preambles if x not in preambles] \
-            + preambles
-        preambles = [textwrap.dedent(x) for x in preambles]
+        # (the device preambles and headers have already been dedented)
+        preambles = [textwrap.dedent(x) for x in self.target_preambles
+                     if x not in preamble_set] + preambles
 
         # and place in codegen
         return result.copy(instructions=instructions, preambles=preambles,
@@ -2396,7 +2882,7 @@ def _deduplicate(self, record, results):
         out = []
         for result in reversed(results):
             # remove shared inits
-            result = result.copy(inits={k: v for k, v in six.iteritems(result.inits)
+            result = result.copy(inits={k: v for k, v in result.inits.items()
                                         if k not in init_list})
             result = result.copy(preambles=[v for v in result.preambles
                                             if v not in preamble_list])
@@ -2424,9 +2910,12 @@ def _set_dependencies(self, codegen_results):
             The results with the :attr:`dependencies` set.
         """
 
-        generators = self._get_deps(include_self=True)
+        # map generator name -> generator (first occurrence wins)
+        generators = OrderedDict()
+        for x in self._get_deps(include_self=True):
+            generators.setdefault(x.name, x)
         for i, result in enumerate(codegen_results):
-            owner = next(x for x in generators if x.name == result.name)
+            owner = generators[result.name]
             deps = owner._get_deps()
             codegen_results[i] = result.copy(
                 dependencies=[x.name for x in deps if x != owner.name] +
@@ -2462,8 +2951,9 @@ def _set_kernel_data(self, record, for_driver=False):
         # 4. the problem size variable (if for_driver)
 
         # first, find kernel args global kernel args (by name)
-        kernel_data = [x for x in record.args if x.name in set(
-            self.in_arrays + self.out_arrays)]
+        kernel_data = [record.args_by_name[x] for x in
+                       set(self.in_arrays + self.out_arrays)
+                       if x in record.args_by_name]
 
         # and add problem size
         if for_driver:
@@ -2555,8 +3045,8 @@ def _generate_wrapping_kernel(self, path, record=None, result=None,
 
             # add any working buffers from the owner
             record = record.copy(kernel_data=record.kernel_data + [
-                x for x in owner_record.kernel_data if x.name in [
-                    int_work_name, rhs_work_name, local_work_name]])
+                x for x in owner_record.kernel_data
+                if x.name in _work_array_names])
 
         # get the kernel arguments for this :class:`kernel_generator`
         record = self._set_kernel_data(record)
@@ -2625,62 +3115,56 @@ def _to_file(self, path, result, for_driver=False):
             name += '_driver'
 
         # first, load the wrapper as a template
-        with open(os.path.join(
-                script_dir,
-                self.lang,
-                'wrapping_kernel{}.in'.format(utils.file_ext[self.lang])),
-                'r') as file:
-            file_str = file.read()
-            file_src = Template(file_str)
+        file_src = _load_template(os.path.join(
+            _LANG_TEMPLATE_DIR[self.lang],
+            'wrapping_kernel{}.in'.format(self._file_ext)))
+        file_str = file_src.template
+        kernel_defn = self.__get_kernel_defn(result.kernel, remove_work_const=True)
 
         # create the file
-        filename = os.path.join(path, self.file_prefix + name + utils.file_ext[
-            self.lang])
+        filename = os.path.join(path, self.file_prefix + name + self._file_ext)
         with filew.get_file(filename, self.lang, include_own_header=True) as file:
             instructions = utils._find_indent(file_str, 'body', '\n'.join(
                 result.instructions))
-            lines = file_src.safe_substitute(
+            lines = _safe_substitute(
+                file_str,
                 defines='',
                 preamble='',
-                func_define=self.__get_kernel_defn(
-                    result.kernel, remove_work_const=True),
+                func_define=kernel_defn,
                 body=instructions,
                 extra_kernels='\n'.join(result.extra_kernels))
 
             if self.auto_diff:
-                lines = [x.replace('double', 'adouble') for x in lines]
+                lines = _double_re.sub('adouble', lines)
             file.add_lines(lines)
 
         # and the header file
         headers = []
         if for_driver:
             # include header to base call
-            headers.append(basename + utils.header_ext[self.lang])
+            headers.append(basename + self._header_ext)
             if utils.can_vectorize_lang[self.lang]:
                 # add the vectorization header
-                headers.append('vectorization' + utils.header_ext[self.lang])
+                headers.append('vectorization' + self._header_ext)
         else:
             # include sub kernels
             for x in result.dependencies:
-                headers.append(x + utils.header_ext[self.lang])
+                headers.append(x + self._header_ext)
 
         # include the preambles as well, such that they can be
         # included into other files to avoid duplications
-        preambles = '\n'.join(result.preambles + sorted(list(result.inits.values())))
-        preambles = preambles.split('\n')
-        preambles.extend([
-            self.__get_kernel_defn(result.kernel, remove_work_const=True) +
-            utils.line_end[self.lang]])
+        preambles = '\n'.join(result.preambles + sorted(result.inits.values()) +
+                              [kernel_defn + utils.line_end[self.lang]])
 
         with filew.get_header_file(
-            os.path.join(path, self.file_prefix + name + utils.header_ext[
-                self.lang]), self.lang) as file:
+            os.path.join(path, self.file_prefix + name + self._header_ext),
+                self.lang) as file:
 
             file.add_headers(headers)
             if self.auto_diff:
                 file.add_headers('adept.h')
                 file.add_lines('using adept::adouble;\n')
-                preambles = preambles.replace('double', 'adouble')
+                preambles = _double_re.sub('adouble', preambles)
             file.add_lines(preambles)
 
         return filename
@@ -2713,6 +3197,7 @@ def _name(arg):
         for null in null_args:
             unpacks.append((null.name, (null.dtype, 0, 0, scopes.GLOBAL)))
 
+        null_names = set(null.name for null in null_args)
         local_unpacks = []
         for k, (dtype, size, offset, scope) in unpacks:
             if self.unique_pointers:
@@ -2721,8 +3206,7 @@ def _name(arg):
                 offset = '{} * {}'.format(offset, arc.work_size.name)
             local_unpacks.append(
                 self._get_pointer_unpack(k, size, offset, dtype, scope,
-                                         set_null=any(k == null.name for null
-                                                      in null_args), for_driver=True)
+                                         set_null=k in null_names, for_driver=True)
                 )
 
         return CodegenResult(pointer_unpacks=local_unpacks)
@@ -2813,9 +3297,8 @@ def localfy(kernel):
 
         # and add work data
         # add the sub-kernel's work arrays
-        work_arrays = [x for x in driver_memory.kernel_data if x.name in
-                       [rhs_work_name, local_work_name, int_work_name,
-                        w_size.name]]
+        work_arrays = [x for x in driver_memory.kernel_data if
+                       x.name in _work_array_names or x.name == w_size.name]
         # and remove the duplicates / smaller work arrays
         dupl = {}
         for arry in work_arrays:
@@ -2823,7 +3306,7 @@ def localfy(kernel):
                 continue
             if arry.name not in dupl:
                 dupl[arry.name] = arry
-            elif arry.name in [rhs_work_name, local_work_name, int_work_name]:
+            elif arry.name in _work_array_names:
                 def _size(a):
                     from pymbolic import substitute
                     from pymbolic.primitives import Product, Sum
@@ -2842,14 +3325,14 @@ def _size(a):
         result = self._get_local_unpacks(driver_result, record.kernel_data,
                                          null_args=[time_array])
         if self.unique_pointers:
+            kernel_data_names = set(x.name for x in record.kernel_data)
             # add a local pointer unpack to the working buffers
-            for wrk in [x for x in work_arrays if x.name in [
-                        rhs_work_name, local_work_name, int_work_name]]:
+            for wrk in [x for x in work_arrays if x.name in _work_array_names]:
                 # find pointer unpack with smallest matching offset
                 smallest = None
-                for x, (dtype, size, offset, scope) in six.iteritems(
-                        driver_result.pointer_offsets):
-                    if not any(x == y.name for y in record.kernel_data):
+                for x, (dtype, size, offset, scope) in \
+                        driver_result.pointer_offsets.items():
+                    if x not in kernel_data_names:
                         continue
                     if scope != wrk.address_space:
                         continue
@@ -2913,15 +3396,16 @@ def _size(a):
             [self._with_target(p_size)] + work_arrays)
 
         # update callgen
+        in_names = set(self.in_arrays)
+        out_names = set(self.out_arrays)
         callgen = callgen.copy(name=self.name,
                                source_names=callgen.source_names + [filename],
                                max_ic_per_run=int(max_ic_per_run),
                                max_ws_per_run=int(max_ws_per_run),
                                input_args={self.name: [
-                                x for x in record.args if x.name in self.in_arrays]},
+                                x for x in record.args if x.name in in_names]},
                                output_args={self.name: [
-                                x for x in record.args
-                                if x.name in self.out_arrays]},
+                                x for x in record.args if x.name in out_names]},
                                work_arrays=work_arrays,
                                host_constants={
                                 self.name: wrapper_memory.host_constants[:]})
@@ -2936,25 +3420,32 @@ def remove_unused_temporaries(self, knl):
         """
         new_args = []
 
-        exp_knl = lp.expand_subst(knl)
+        exp_knl = lp.expand_subst(knl) if knl.substitutions else knl
 
         refd_vars = set(knl.all_params())
         for insn in exp_knl.instructions:
             refd_vars.update(insn.dependency_names())
 
-        from loopy.kernel.array import ArrayBase, FixedStrideArrayDimTag
-        from loopy.symbolic import get_dependencies
-        from itertools import chain
+        # many arrays share the same shape / offset / stride expressions, hence
+        # cache the dependencies on expression identity (the expressions are
+        # kept alive in the cache for the duration of this call)
+        dep_cache = {}
 
         def tolerant_get_deps(expr, parse=False):
             if expr is None or expr is lp.auto:
-                return set()
+                return frozenset()
+            key = (id(expr), parse)
+            if key in dep_cache:
+                return dep_cache[key][1]
+            parsed = expr
             if parse and isinstance(expr, tuple):
                 from loopy.kernel.array import _pymbolic_parse_if_necessary
-                expr = tuple(_pymbolic_parse_if_necessary(x) for x in expr)
-            return get_dependencies(expr)
+                parsed = tuple(_pymbolic_parse_if_necessary(x) for x in expr)
+            deps = get_dependencies(parsed)
+            dep_cache[key] = (expr, deps)
+            return deps
 
-        for ary in chain(knl.args, six.itervalues(knl.temporary_variables)):
+        for ary in chain(knl.args, knl.temporary_variables.values()):
             if isinstance(ary, ArrayBase):
                 refd_vars.update(
                     tolerant_get_deps(ary.shape)
@@ -3018,8 +3509,6 @@ def make_kernel(self, info, target, test_size, for_driver=False):
         # look for extra inames, ranges
         iname_range = []
 
-        assumptions = info.assumptions[:]
-
         # find the start index for 'i'
         iname, iname_domain = info.mapstore.get_iname_domain()
 
@@ -3034,50 +3523,45 @@ def make_kernel(self, info, target, test_size, for_driver=False):
             inames.append(iname)
             iname_range.append(irange)
 
-        # construct the kernel args
-        pre_instructions = info.pre_instructions[:]
-        post_instructions = info.post_instructions[:]
-
-        def subs_preprocess(key, value):
-            # find the instance of ${key} in kernel_str
-            result = utils._find_indent(skeleton, key, value)
-            return Template(result).safe_substitute(var_name=info.var_name)
+        # construct the kernel args -- the knl_info owns copies of its instructions,
+        # and these are not modified here
+        pre_instructions = info.pre_instructions
+        post_instructions = info.post_instructions
 
-        kernel_str = Template(skeleton).safe_substitute(
-            var_name=info.var_name,
-            pre=subs_preprocess('${pre}', '\n'.join(pre_instructions)),
-            post=subs_preprocess('${post}', '\n'.join(post_instructions)),
-            main=subs_preprocess('${main}', '\n'.join(instructions)))
-
-        # finally do extra subs
-        if info.extra_subs:
-            kernel_str = Template(kernel_str).safe_substitute(
-                **info.extra_subs)
+        kernel_str = _substitute_kernel_body(
+            skeleton, info.var_name, pre_instructions, instructions,
+            post_instructions, extra_subs=info.extra_subs)
 
         iname_arr = []
+        # and the (flattened) inames, in loop priority order
+        priority = []
         # generate iname strings
-        for iname, irange in zip(*(inames, iname_range)):
+        for iname, irange in zip(inames, iname_range):
             if isinstance(iname, tuple):
                 # multi-domain
+                priority.extend(iname)
                 iname = ', '.join(iname)
+            else:
+                priority.extend(iname.split(','))
 
-            iname_arr.append(Template(
-                '{[${iname}]:${irange}}').safe_substitute(
-                iname=iname,
-                irange=irange
-            ))
+            iname_arr.append('{{[{}]:{}}}'.format(iname, irange))
 
         # get extra mapping data
         extra_kernel_data = [domain(node.iname)[0] for domain, node in
-                             six.iteritems(info.mapstore.domain_to_nodes)
+                             info.mapstore.domain_to_nodes.items()
                              if not node.is_leaf()]
 
-        extra_kernel_data += self.extra_kernel_data[:]
+        extra_kernel_data += self.extra_kernel_data
 
         # check for duplicate kernel data (e.g. multiple phi arguements)
+        # comparison of loopy arguments is structural (and hence expensive), so
+        # only compare against the previously seen arguments of the same name
         kernel_data = []
+        seen = defaultdict(list)
         for k in info.kernel_data + extra_kernel_data:
-            if k not in kernel_data:
+            same_name = seen[getattr(k, 'name', id(k))]
+            if k not in same_name:
+                same_name.append(k)
                 kernel_data.append(k)
 
         # make the kernel
@@ -3097,19 +3581,12 @@ def subs_preprocess(key, value):
             knl = lp.fix_parameters(knl, **{w_size.name: self.work_size})
         if not knl.loop_priority:
             # prioritize and return
-            priority = []
-            for iname in inames:
-                try:
-                    iname = iname.split(',')
-                except AttributeError:
-                    pass
-                priority.extend(iname)
             knl = lp.prioritize_loops(knl, priority)
         # check manglers
         if info.manglers:
             knl = lp.register_function_manglers(knl, info.manglers)
 
-        preambles = info.preambles + self.extra_preambles[:]
+        preambles = info.preambles + self.extra_preambles
         # check preambles
         if preambles:
             # register custom preamble functions
@@ -3184,6 +3661,9 @@ def apply_specialization(cls, loopy_opts, inner_ind, knl,
                                          'vectorization function'.format(
                                              knl.name))
         specialization = {}
+        # tags to apply to the kernel (in a single transformation) before any
+        # vector specialization
+        tags = []
 
         # if we're splitting
         # apply specified optimizations
@@ -3196,7 +3676,7 @@ def apply_specialization(cls, loopy_opts, inner_ind, knl,
                 specialization[to_split + '_inner'] = tag
             elif loopy_opts.pre_split:
                 # apply the pre-split
-                knl = lp.tag_inames(knl, [(to_split + '_inner', tag)])
+                tags.append((to_split + '_inner', tag))
             else:
                 knl = lp.split_iname(knl, to_split, vec_width, inner_tag=tag)
 
@@ -3205,7 +3685,10 @@ def apply_specialization(cls, loopy_opts, inner_ind, knl,
             if get_specialization:
                 specialization[j_tag] = 'g.0'
             else:
-                knl = lp.tag_inames(knl, [(j_tag, 'g.0')])
+                tags.append((j_tag, 'g.0'))
+
+        if tags:
+            knl = lp.tag_inames(knl, tags)
 
         # if we have a specialization
         if vecspec and not get_specialization:
@@ -3213,7 +3696,9 @@ def apply_specialization(cls, loopy_opts, inner_ind, knl,
 
         if bool(vec_width) and not loopy_opts.is_simd and not get_specialization:
             # finally apply the vector width fix above
-            ggs = vecwith_fixer(knl.copy(), vec_width)
+            # (kernels are immutable, so no copy is required for the 'clean'
+            # version)
+            ggs = vecwith_fixer(knl, vec_width)
             knl = knl.copy(overridden_get_grid_sizes_for_insn_ids=ggs)
 
         # now do unr / ilp
@@ -3422,7 +3907,7 @@ def add_jacobian(self, jacobian):
         None
         """
 
-        self.extra_kernel_data.append(jacobian)
+        self.extra_kernel_data = self.extra_kernel_data + [jacobian]
 
 
 class ispc_kernel_generator(kernel_generator):
@@ -3448,12 +3933,14 @@ def __init__(self, *args, **kwargs):
         }
 
         # set atomic types
-        self.type_map[to_loopy_type(np.float64, for_atomic=True,
-                                    target=self.target)] = 'double'
-        self.type_map[to_loopy_type(np.int32, for_atomic=True,
-                                    target=self.target)] = 'int'
-        self.type_map[to_loopy_type(np.int64, for_atomic=True,
-                                    target=self.target)] = 'long int'
+        self.type_map.update({
+            to_loopy_type(dtype, for_atomic=True, target=self.target): ctype
+            for dtype, ctype in self._TYPE_MAP})
+
+        # the platform vendor / CL level require (potentially slow) queries of the
+        # OpenCL runtime, and are computed on first use
+        self._platform_str = None
+        self._cl_level = None
 
     @property
     def target_preambles(self):
@@ -3592,6 +4079,11 @@ def _get_cl_level(self):
             The stringified OpenCL standard level
         """
 
+        if self._cl_level is None:
+            self._cl_level = self.__find_cl_level()
+        return self._cl_level
+
+    def __find_cl_level(self):
         # try get the platform's CL level
         try:
             device_level = self.loopy_opts.device.opencl_c_version.split()
@@ -3619,6 +4111,11 @@ def build_options(self, path):
 
     @property
     def platform_str(self):
+        if self._platform_str is None:
+            self._platform_str = self.__find_platform_str()
+        return self._platform_str
+
+    def __find_platform_str(self):
         # get the platform from the options
         if self.loopy_opts.platform_is_pyopencl:
             platform_str = self.loopy_opts.platform.get_info(
@@ -3650,11 +4147,14 @@ def _generate_compiling_program(self, path, callgen):
         """
 
         outname = os.path.join(path, self.name + '.bin')
+        platform = self.platform_str
+        build_options = self.build_options(path)
+
         result = CompgenResult(name=self.name,
                                source_names=callgen.source_names[:],
-                               platform=self.platform_str,
+                               platform=platform,
                                outname=outname,
-                               build_options=self.build_options(path))
+                               build_options=build_options)
         # serialize
         compout = os.path.join(path, 'comp.pickle')
         with open(compout, 'wb') as file:
@@ -3662,11 +4162,11 @@ def _generate_compiling_program(self, path, callgen):
 
         # input
         infile = os.path.join(
-            script_dir, self.lang, 'opencl_kernel_compiler.cpp.in')
+            _LANG_TEMPLATE_DIR[self.lang], 'opencl_kernel_compiler.cpp.in')
 
         # output
         filename = os.path.join(
-            path, self.name + '_compiler' + utils.file_ext[self.lang])
+            path, self.name + '_compiler' + self._file_ext)
 
         # call cog
         try:
@@ -3681,6 +4181,55 @@ def _generate_compiling_program(self, path, callgen):
         return callgen.copy(source_names=callgen.source_names + [filename],
                             binname=result.outname)
 
+    def _generate_source_hash(self, path):
+        """
+        Hashes the OpenCL sources and headers in :param:`path`, along with the
+        platform and build options, and stores the result next to the kernel
+        binary.  The compiling program combines this hash with the name and
+        driver version of the device it selects at run-time, and skips the build
+        if the existing binary was compiled from the same combination.
+
+        Parameters
+        ----------
+        path : str
+            The output path the sources were written to
+
+        Returns
+        -------
+        None
+
+        Notes
+        -----
+        This must be called after all sources, headers and dependencies have
+        been written to :param:`path`.  Headers outside of :param:`path` (i.e.,
+        from the site's include directories) are not hashed.
+
+        The hashed files are listed after the hash, and the compiling program
+        also rebuilds the binary if any of these have been modified since they
+        were hashed (e.g., if a source is edited or re-generated in place).  A
+        rebuild may be forced by compiling the compiling program with
+        PYJAC_FORCE_REBUILD defined, or by deleting the hash file.
+        """
+
+        outname = os.path.join(path, self.name + '.bin')
+        exts = (self._file_ext, self._header_ext, utils.header_ext['c'])
+        sources = sorted(x for x in os.listdir(path) if x.endswith(exts) and
+                         os.path.isfile(os.path.join(path, x)))
+        sources = [(name, os.path.abspath(os.path.join(path, name)))
+                   for name in sources]
+        source_hash = hashlib.sha1()
+        for name, source in sources:
+            source_hash.update(name.encode('utf-8'))
+            with open(source, 'rb') as file:
+                source_hash.update(file.read())
+        source_hash.update(repr((self.platform_str, self.build_options(path))
+                                ).encode('utf-8'))
+        # write the hash, followed by the hashed files such that the compiling
+        # program can detect any that are modified after generation
+        with open(outname + '.sha1', 'w') as file:
+            file.write('\n'.join([source_hash.hexdigest()] +
+                                  [source for _, source in sources]) + '\n')
+
     def apply_barriers(self, instructions, barriers=None):
         """
         An override of :method:`kernel_generator.apply_barriers` that
@@ -3707,19 +4256,23 @@ def apply_barriers(self, instructions, barriers=None):
             barriers = [b for d in reversed(self._get_deps(include_self=True))
                         for b in d.barriers]
 
-        instructions = list(enumerate(instructions))
+        # map the insert index (the second barrier ind) to the barrier
+        inserts = {}
         for barrier in barriers:
-            # find insert index (the second barrier ind)
-            index = next(ind for ind, inst in enumerate(instructions)
-                         if inst[0] == barrier[1])
             # check that we're inserting between the required barriers
-            assert barrier[0] == instructions[index - 1][0]
-            # and insert
-            instructions.insert(index, (-1, self.barrier_templates[barrier[2]]
-                                        + utils.line_end[self.lang]))
-        # and get rid of indicies
-        instructions = [inst[1] for inst in instructions]
-        return instructions
+            assert barrier[0] + 1 == barrier[1] and \
+                0 < barrier[1] < len(instructions)
+            assert barrier[1] not in inserts
+            inserts[barrier[1]] = self.barrier_templates[barrier[2]] + \
+                utils.line_end[self.lang]
+
+        # and insert
+        synchronized = []
+        for i, inst in enumerate(instructions):
+            if i in inserts:
+                synchronized.append(inserts[i])
+            synchronized.append(inst)
+        return synchronized
 
     @property
     def hoist_locals(self):
@@ -3736,6 +4289,19 @@ def hoist_locals(self):
         return True
 
 
+_generator_dispatch = {
+    ('c', False): c_kernel_generator,
+    ('c', True): autodiff_kernel_generator,
+    ('opencl', False): opencl_kernel_generator,
+    ('opencl', True): opencl_kernel_generator,
+    ('ispc', False): ispc_kernel_generator,
+    ('ispc', True): ispc_kernel_generator}
+"""
+The :class:`kernel_generator` types used by :func:`make_kernel_generator`, keyed
+on the (language, auto-differentiation) of the :class:`LoopyOptions`
+"""
+
+
 class knl_info(object):
 
     """
@@ -3816,7 +4382,7 @@ def __listify(arr):
         self.split_specializer = split_specializer
         self.manglers = []
         # copy if supplied
-        self.preambles = [x for x in preambles]
+        self.preambles = list(preambles)
         for mangler in manglers:
             if isinstance(mangler, PreambleMangler):
                 self.manglers.extend(mangler.manglers)
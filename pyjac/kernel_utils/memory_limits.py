@@ -29,6 +29,8 @@
 except ImportError:
     DTYPE_CPU = -1
 
+_floor_div_re = re.compile(r'// (\d+)')
+
 
 class memory_type(Enum):
     m_constant = 0,
@@ -109,6 +111,43 @@ def __init__(self, args=[], local=[], readonly=[], constants=[],
             valueargs=valueargs, host_constants=host_constants,
             kernel_data=kernel_data)
 
+    def by_name(self, field):
+        """
+        Returns a mapping of name -> argument for the list :param:`field` of this
+        record (e.g., 'args', 'local', or 'kernel_data'), built on first access.
+        As the record is immutable (updates are made via :func:`copy`), the
+        mappings never need to be invalidated.
+
+        Parameters
+        ----------
+        field: str
+            The name of the field to index
+
+        Returns
+        -------
+        by_name: dict of str -> :class:`loopy.KernelArgument`
+            The indexed arguments
+        """
+
+        try:
+            index = self._by_name
+        except AttributeError:
+            index = self._by_name = {}
+        try:
+            return index[field]
+        except KeyError:
+            index[field] = {x.name: x for x in getattr(self, field)}
+            return index[field]
+
+    @property
+    def args_by_name(self):
+        """
+        A mapping of argument name -> :class:`loopy.ArrayArg` for :attr:`args`,
+        see :func:`by_name`
+        """
+
+        return self.by_name('args')
+
 
 class memory_limits(object):
     """
@@ -268,15 +307,16 @@ def __calculate_alloc_limit(limit):
             is_ic_dep = False
             is_ws_dep = False
             for s in array.shape:
-                if w_size.name in str(s):
+                str_s = str(s)
+                if w_size.name in str_s:
                     # mark as dependent on the work size
                     is_ws_dep = True
-                elif p_size.name in str(s):
+                elif p_size.name in str_s:
                     # mark as dependent on # of initial conditions
                     is_ic_dep = True
                 if is_ic_dep or is_ws_dep:
                     # get the floor div (if any)
-                    floor_div = re.search(r'// (\d+)', str(s))
+                    floor_div = _floor_div_re.search(str_s)
                     if floor_div:
                         floor_div = int(floor_div.group(1))
                         size /= floor_div
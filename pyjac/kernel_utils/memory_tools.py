@@ -148,6 +148,8 @@ def __init__(self, lang, order, type_map, alloc={}, sync={}, copy_in_1d={},
         self.host_const_in = host_const_in
         self.host_namer = host_namer
         self.device_namer = device_namer
+        # the type map is fixed, hence we can reuse a single stride calculator
+        self.stride_calc = StrideCalculator(self.type_map)
         self.definition = {'c': Template('${mem_type} ${name};'),
                            'opencl': Template('${mem_type} ${name};')}
 
@@ -179,18 +181,18 @@ def dtype(self, device, arr, include_pointer=False):
         return self.mem_type[self.lang(device)](arr, include_pointer=include_pointer)
 
     def buffer_size(self, device, arr, num_ics='per_run', include_sizeof=True):
-        calc = StrideCalculator(self.type_map)
         # setup substitution for device buffer # of initial conditions
         subs = {}
         if device:
             subs[problem_size.name] = num_ics
-        return calc.buffer_size(arr, subs, include_sizeof=include_sizeof)
+        return self.stride_calc.buffer_size(arr, subs,
+                                            include_sizeof=include_sizeof)
 
     def non_ic_size(self, arr, subs=None):
         kwargs = {}
         if subs:
             kwargs['subs'] = subs
-        return StrideCalculator(self.type_map).non_ic_size(arr, **kwargs)
+        return self.stride_calc.non_ic_size(arr, **kwargs)
 
     def get_name(self, device, arr, **kwargs):
         namer = self.device_namer if device else self.host_namer
@@ -325,12 +327,11 @@ def copy(self, to_device, arr, host_constant=False, num_ics='per_run',
             kwargs['offset'] = offset
             # update special sizes in kwargs
             kwargs['non_ic_size'] = self.non_ic_size(arr)
-            kwargs['per_run_size'] = self.buffer_size(True, arr,
-                                                      num_ics=num_ics)
+            buff_size = self.buffer_size(True, arr, num_ics=num_ics)
+            kwargs['per_run_size'] = buff_size
             kwargs['this_run_size'] = self.buffer_size(True, arr,
                                                        num_ics=num_ics_this_run)
             kwargs['itemsize'] = 'sizeof({})'.format(self.type_map[arr.dtype])
-            buff_size = self.buffer_size(True, arr, num_ics=num_ics)
         else:
             kwargs['offset'] = '0'
             buff_size = self.buffer_size(False, arr)
@@ -617,8 +618,15 @@ def __update(key, val):
         copy_out_1d = self._get_2d_templates(
             lang, to_device=False, use_full=use_full)
         __update('copy_out_1d', copy_out_1d)
-        host_constant_template = self._get_2d_templates(
-            lang, to_device=True, use_full=True)
+        if lang == 'opencl':
+            # host constants are written once on initialization, hence we enqueue
+            # the writes without blocking and wait on them all at once after
+            host_constant_template = Template(guarded_call(
+                lang, 'clEnqueueWriteBuffer(queue, ${dev_name}, CL_FALSE, 0, '
+                      '${buff_size}, &${host_name}, 0, NULL, NULL)'))
+        else:
+            host_constant_template = self._get_2d_templates(
+                lang, to_device=True, use_full=True)
         __update('host_const_in', host_constant_template)
         free = {'opencl': Template(guarded_call(
                          'opencl', 'clReleaseMemObject(${name})')),
@@ -693,19 +701,37 @@ def __init__(self, lang, order, type_map, host_namer=None, device_namer=None,
                   'NULL, NULL)')}
         self.map_flags = {'opencl': {True: 'CL_MAP_WRITE',
                                      False: 'CL_MAP_READ'}}
-
-        dev_map_template = Template(Template(
+        # buffers that are entirely overwritten once mapped (i.e., host constants
+        # and memsets) need not transfer their current contents on mapping (where
+        # supported).  Note: regular copies only fill the current run, hence may
+        # not discard the remainder of the buffer
+        self.map_overwrite_template = {'opencl': Template(
+            '#if CL_LEVEL >= 120\n' +
+            indent(Template(self.map_template[lang]).safe_substitute(
+                map_flags='CL_MAP_WRITE_INVALIDATE_REGION'), stdindent) +
+            '\n#else\n' +
+            indent(Template(self.map_template[lang]).safe_substitute(
+                map_flags='CL_MAP_WRITE'), stdindent) +
+            '\n#endif').template}
+
+        dev_map_template = Template(
             '// map to host address space for initialization\n'
             '${map}\n'
             '// set memory\n'
             '${host}\n'
             '// and unmap back to device\n'
-            '${unmap}\n').safe_substitute(
-            map=self.map_template[lang],
-            unmap=self.unmap_template[lang]
-        ))
+            '${unmap}\n')
+
+        def __dev_map(map_template):
+            return Template(dev_map_template.safe_substitute(
+                map=map_template[lang],
+                unmap=self.unmap_template[lang]))
+
+        dev_map = __dev_map(self.map_template)
+        dev_overwrite = __dev_map(self.map_overwrite_template)
         # now need to place a map around the copies
-        copies = {k: Template(dev_map_template.safe_substitute(
+        copies = {k: Template((dev_overwrite if k == 'host_const_in' else
+                               dev_map).safe_substitute(
             host=v.safe_substitute(dev_name='${temp_name}')))
             for k, v in six.iteritems(copies)}
 
@@ -720,7 +746,7 @@ def __init__(self, lang, order, type_map, host_namer=None, device_namer=None,
         memset = {
             'c': Template('memset(${name}, 0, ${buff_size});')
         }
-        memset[lang] = Template(dev_map_template.safe_substitute(
+        memset[lang] = Template(dev_overwrite.safe_substitute(
             host=memset[host_langs[lang]].safe_substitute(
                 name='${temp_name}'),
             dev_name='${name}',
@@ -9,6 +9,8 @@
 import numpy as np
 from pyjac.utils import partition, is_integer, header_ext, subs_at_indent
 
+_work_size_re = re.compile(r'work_size\s*\*\s*(\d+)')
+
 
 def get_include(callgen, file):
     """
@@ -123,12 +125,12 @@ def max_size(mem, args):
                 if not isinstance(arr, lp.ValueArg)]
 
     problem_sizes, work_sizes = partition(max_size, is_integer)
-    problem_size = '{} * problem_size'.format(max([int(x) for x in problem_sizes]))
+    problem_size = '{} * problem_size'.format(max(int(x) for x in problem_sizes))
+    # extract the work sizes
+    work_size = [_work_size_re.search(x) for x in work_sizes]
     # make sure work sizes are what we expect
-    regex = re.compile(r'work_size\s*\*\s*(\d+)')
-    assert all(regex.search(x) for x in work_sizes)
-    # next, extract the work sizes
-    work_size = [int(regex.search(x).group(1)) for x in work_sizes]
+    assert all(work_size)
+    work_size = [int(x.group(1)) for x in work_size]
     if not work_size:
         # fixed work size
         return '({})'.format(problem_size)
@@ -232,24 +232,16 @@ def kf_fall_eval(i, j):
             self.rxn_rates[i, :] = gas.net_rates_of_progress[:]
             self.species_rates[i, :] = gas.net_production_rates[:]
             self.ref_thd[i, :] = np.dot(thd_eff_maps, self.concs[i, :])
-            # species thermo props
-            for j in range(gas.n_species):
-                cp = gas.species(j).thermo.cp(self.T[i])
-                s = gas.species(j).thermo.s(self.T[i])
-                h = gas.species(j).thermo.h(self.T[i])
-                self.spec_cv[i, j] = cp - ct.gas_constant
-                self.spec_cp[i, j] = cp
-                self.spec_b[i, j] = s / ct.gas_constant - h / \
-                    (ct.gas_constant * self.T[i]) - np.log(self.T[i])
-                self.spec_u[i, j] = h - self.T[i] * ct.gas_constant
-                self.spec_h[i, j] = h
-
-            self.conp_temperature_rates[i] = (
-                -np.dot(self.spec_h[i, :], self.species_rates[i, :]) / np.dot(
-                    self.spec_cp[i, :], self.concs[i, :]))
-            self.conv_temperature_rates[i] = (
-                -np.dot(self.spec_u[i, :], self.species_rates[i, :]) / np.dot(
-                    self.spec_cv[i, :], self.concs[i, :]))
+            # (non-dimensional) species thermo props, evaluated for all species
+            # at once from the standard-state properties of the current gas state
+            # -- the derived properties are evaluated over all states below
+            self.spec_cp[i, :] = gas.standard_cp_R
+            # note: the standard-state entropies are evaluated at the current
+            # pressure, hence we correct back to the reference pressure
+            self.spec_b[i, :] = gas.standard_entropies_R - \
+                gas.standard_enthalpies_RT + np.log(
+                    self.P[i] / gas.reference_pressure)
+            self.spec_h[i, :] = gas.standard_enthalpies_RT
             for j in range(self.fall_inds.size):
                 self.fall_rate_constants[i, j] = kf_fall_eval(i, j)
                 arrhen_temp[j] = pr_eval(i, j)
@@ -264,11 +256,23 @@ def kf_fall_eval(i, j):
                 self.ref_Fall[i, self.sri_to_pr_map] = self.ref_Sri[i, :]
             if self.troe_inds.size:
                 self.ref_Fall[i, self.troe_to_pr_map] = self.ref_Troe[i, :]
-            for j in range(gas.n_species):
-                self.ref_B_rev[i, j] = gas.species(j).thermo.s(
-                    self.T[i]) / ct.gas_constant - gas.species(j).thermo.h(
-                        self.T[i]) / (ct.gas_constant * self.T[i]) - np.log(
-                        self.T[i])
+
+        # species thermo props
+        RT = ct.gas_constant * self.T[:, np.newaxis]
+        self.spec_cp *= ct.gas_constant
+        self.spec_cv[:] = self.spec_cp - ct.gas_constant
+        self.spec_b -= np.log(self.T)[:, np.newaxis]
+        self.spec_h *= RT
+        self.spec_u[:] = self.spec_h - RT
+        self.ref_B_rev[:] = self.spec_b
+
+        # and temperature rates
+        self.conp_temperature_rates[:] = (
+            -np.sum(self.spec_h * self.species_rates, axis=1) / np.sum(
+                self.spec_cp * self.concs, axis=1))
+        self.conv_temperature_rates[:] = (
+            -np.sum(self.spec_u * self.species_rates, axis=1) / np.sum(
+                self.spec_cv * self.concs, axis=1))
 
         # set phi
         self.phi_cp = np.concatenate((self.T.reshape(-1, 1),
@@ -20,7 +20,7 @@
 from pyjac.kernel_utils.memory_limits import memory_type
 from pyjac.kernel_utils.kernel_gen import kernel_generator, TargetCheckingRecord, \
     knl_info, make_kernel_generator, CallgenResult, local_work_name, rhs_work_name, \
-    int_work_name
+    int_work_name, _substitute_kernel_body
 from pyjac.utils import partition, temporary_directory, clean_dir, \
     can_vectorize_lang, header_ext, file_ext
 from pyjac.tests import TestClass
@@ -645,6 +645,37 @@ def __get_result(gen, record=None):
             assert pre[0].code in preambles
             assert pre[0].code in k0.preambles
 
+    def test_substitute_kernel_body(self):
+        skeleton = textwrap.dedent("""
+            for ${var_name} $${lit}
+                ${pre}
+                ${main}
+                ${post}
+            end""")
+        pre = ['a = ${var_name}']
+        main = ['b = $${key}', 'c = $$$$']
+        post = ['d']
+
+        # each pass resolves a level of escapes
+        assert _substitute_kernel_body(skeleton, 'j', pre, main, post) == \
+            textwrap.dedent("""
+            for j ${lit}
+                a = j
+                b = ${key}
+                c = $$
+                d
+            end""")
+        # and the extra subs are substituted into the complete kernel
+        assert _substitute_kernel_body(
+            skeleton, 'j', pre, main, post,
+            extra_subs={'key': 'k', 'lit': 'l'}) == textwrap.dedent("""
+            for j l
+                a = j
+                b = k
+                c = $
+                d
+            end""")
+
     def test_compilation_generator(self):
         # currently separate compiler code only exists for OpenCL
         oploop = OptionLoopWrapper.from_get_oploop(self,
@@ -676,6 +707,29 @@ def test_compilation_generator(self):
                 # and platform
                 assert 'char* platform = "{}";'.format(
                     opts.platform.vendor)
+                # and the hashes used to skip re-compilation
+                outname = os.path.join(tdir, kgen.name + '.bin')
+                assert 'char* hash_name = "{}";'.format(outname + '.sha1') in comp
+                assert 'char* build_name = "{}";'.format(outname + '.inf') in comp
+                # and the option to force a rebuild
+                assert '#ifndef PYJAC_FORCE_REBUILD' in comp
+
+                # check that the source hash tracks changes to headers
+                def _get_hash():
+                    kgen._generate_source_hash(tdir)
+                    with open(outname + '.sha1', 'r') as file:
+                        return file.read().splitlines()
+
+                header = os.path.join(tdir, 'test' + header_ext[opts.lang])
+                with open(header, 'w') as file:
+                    file.write('#define TEST (1)')
+                base = _get_hash()
+                assert base == _get_hash()
+                # the hashed files are listed after the hash
+                assert os.path.abspath(header) in base[1:]
+                with open(header, 'w') as file:
+                    file.write('#define TEST (2)')
+                assert base[0] != _get_hash()[0]
 
     def __get_call_kernel_generator(self, opts, spec_name='spec'):
         # create some test kernels
@@ -16,7 +16,7 @@
 from pyjac.core.array_creator import array_splitter, problem_size, MapStore, \
     creator, kint_type
 from pyjac.kernel_utils.memory_limits import memory_limits, memory_type, \
-    get_string_strides
+    get_string_strides, MemoryGenerationResult
 from pyjac.kernel_utils.kernel_gen import find_inputs_and_outputs, \
     _unSIMDable_arrays, knl_info, make_kernel_generator
 from pyjac.tests.test_utils import OptionLoopWrapper
@@ -126,6 +126,19 @@ def test_get_kernel_input_and_output():
     assert find_inputs_and_outputs(knl) == set(['b', 'c'])
 
 
+def test_memgen_args_by_name():
+    a = lp.GlobalArg('a', shape=(2,), dtype=np.float64)
+    b = lp.GlobalArg('b', shape=(2,), dtype=np.float64)
+    record = MemoryGenerationResult(args=[a, b])
+    assert record.args_by_name == {'a': a, 'b': b}
+
+    # and check that copies are re-indexed
+    record = record.copy(args=[b], local=[a])
+    assert record.args_by_name == {'b': b}
+    assert record.by_name('local') == {'a': a}
+    assert record.by_name('kernel_data') == {}
+
+
 def test_unsimdable():
     from loopy.kernel.array import (VectorArrayDimTag)
     inds = ('j', 'i')
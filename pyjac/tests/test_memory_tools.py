@@ -184,10 +184,12 @@ def test_memory_tools_memset():
             if wrapper.state['dev_mem_type'] == DeviceMemoryType.pinned:
                 # pinned -> should have a regular memset
                 assert 'memset(temp_i, 0, 10 * per_run * sizeof(int));' in dev
-                # and map / unmaps
-                assert ('clEnqueueMapBuffer(queue, a1, CL_TRUE, CL_MAP_WRITE, '
-                        '0, 10 * per_run * sizeof(int), 0, NULL, NULL, &return_code)'
-                        ) in dev
+                # and map / unmaps, invalidating the region where supported
+                assert '#if CL_LEVEL >= 120' in dev
+                for flags in ['CL_MAP_WRITE_INVALIDATE_REGION', 'CL_MAP_WRITE']:
+                    assert ('clEnqueueMapBuffer(queue, a1, CL_TRUE, {}, '
+                            '0, 10 * per_run * sizeof(int), 0, NULL, NULL, '
+                            '&return_code)'.format(flags)) in dev
                 assert ('check_err(clEnqueueUnmapMemObject(queue, a1, temp_i, 0, '
                         'NULL, NULL));') in dev
 
@@ -256,13 +258,22 @@ def test_memory_tools_copy():
             dev = mem.copy(True, a1, host_constant=True)
             if wrapper.state['dev_mem_type'] == DeviceMemoryType.pinned:
                 assert 'clEnqueueUnmapMemObject' in dev
+                assert '#if CL_LEVEL >= 120' in dev
+                for flags in ['CL_MAP_WRITE_INVALIDATE_REGION', 'CL_MAP_WRITE']:
+                    assert ('h_temp_i = (int*)clEnqueueMapBuffer(queue, d_a1, '
+                            'CL_TRUE, {}, 0, problem_size * sizeof(int), 0, NULL, '
+                            'NULL, &return_code);'.format(flags)) in dev
+                assert 'memcpy(h_temp_i, h_a1, problem_size * sizeof(int));' in dev
+                # regular copies only fill the current run, and hence must not
+                # invalidate the mapped buffer
+                dev = mem.copy(True, a1)
                 assert ('h_temp_i = (int*)clEnqueueMapBuffer(queue, d_a1, CL_TRUE, '
-                        'CL_MAP_WRITE, 0, problem_size * sizeof(int), 0, NULL, '
+                        'CL_MAP_WRITE, 0, per_run * sizeof(int), 0, NULL, '
                         'NULL, &return_code);') in dev
-                assert 'memcpy(h_temp_i, h_a1, problem_size * sizeof(int));' in dev
+                assert 'INVALIDATE' not in dev
             else:
                 # mapped
-                assert ('clEnqueueWriteBuffer(queue, d_a1, CL_TRUE, 0, '
+                assert ('clEnqueueWriteBuffer(queue, d_a1, CL_FALSE, 0, '
                         'problem_size * sizeof(int), &h_a1, 0, NULL, NULL)') in dev
 
             dev = mem.copy(False, d3, offset='test', num_ics_this_run='test2')
@@ -612,6 +623,9 @@ def _get_dtype(dtype):
                         cog.outl(mem.alloc(True, arr))
                         # copy host constants
                         cog.outl(mem.copy(True, arr, host_constant=True))
+                    if lang == 'opencl' and callgen.host_constants['test']:
+                        # wait for the non-blocking host constant writes
+                        cog.outl('check_err(clFinish(queue));')
 
                     def _get_size(arr):
                         size = 1
@@ -11,6 +11,7 @@
 import numpy as np
 from parameterized import parameterized, param
 from unittest.case import SkipTest
+from nose.tools import assert_raises
 try:
     from scipy.sparse import csr_matrix, csc_matrix, coo_matrix
 except ImportError:
@@ -75,6 +76,26 @@ def test_listify(value, expected):
     assert listify(value) == expected
 
 
+def test_subs_at_indent():
+    template = """
+    ${first}
+        a ${second} ${first}
+    $${escaped} ${unused}
+    """
+    result = utils.subs_at_indent(template, first='1\n2', second=3)
+    assert result == """
+    1
+    2
+        a 3 1
+    2
+    ${escaped} ${unused}
+    """
+
+    # keys not in the template should raise
+    with assert_raises(Exception):
+        utils.subs_at_indent(template, missing='1')
+
+
 @parameterized([param(
     (1024, 4, 4), lambda y, z: y + z <= 4, [np.arange(4), np.arange(4)], (1, 2)),
                 param(
@@ -1117,7 +1117,7 @@ def __init__(self, oploop_base, skip_test=None, yield_index=False,
         self.yield_index = yield_index
         self.skip_test = skip_test
         self.bad_platforms = set()
-        self.ignored_state_vals = ignored_state_vals[:]
+        self.ignored_state_vals = frozenset(ignored_state_vals)
         self.skip_deep_simd = skip_deep_simd
 
     @staticmethod
@@ -1203,8 +1203,8 @@ def send(self, ignored_arg):
                 # and set any ignored state values for reference
                 self.state = state.copy()
                 # and build options
-                opts = loopy_options(**{x: state[x] for x in state
-                                     if x not in self.ignored_state_vals})
+                opts = loopy_options(**{k: v for k, v in state.items()
+                                        if k not in self.ignored_state_vals})
             except MissingPlatformError:
                 # warn and skip future tests
                 logger = logging.getLogger(__name__)
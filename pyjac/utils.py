@@ -738,6 +738,21 @@ def check_order(order):
         raise exceptions.InvalidInputSpecificationException('order')
 
 
+_leading_whitespace = re.compile(r'\s*')
+
+
+def _indent_value(whitespace, value):
+    """
+    Returns :param:`value` (dedented) with :param:`whitespace` prepended to all
+    but the first line
+    """
+
+    if value[:1].isspace() or '\n ' in value or '\n\t' in value:
+        # only dedent if some line is actually indented
+        value = textwrap.dedent(value)
+    return ('\n' + whitespace).join(value.splitlines())
+
+
 def _find_indent(template_str, key, value):
     """
     Finds and returns a formatted value containing the appropriate
@@ -759,17 +774,19 @@ def _find_indent(template_str, key, value):
     """
 
     # find the instance of ${key} in kernel_str
-    whitespace = None
-    for i, line in enumerate(template_str.split('\n')):
-        if key in line:
-            # get whitespace
-            whitespace = re.match(r'\s*', line).group()
-            break
-    if whitespace is None:
+    index = template_str.find(key)
+    if index < 0:
         raise Exception('Key {} not found in template: {}'.format(key, template_str))
-    result = [line if i == 0 else whitespace + line for i, line in
-              enumerate(textwrap.dedent(value).splitlines())]
-    return '\n'.join(result)
+    # and get the whitespace at the start of its line
+    start = template_str.rfind('\n', 0, index) + 1
+    whitespace = _leading_whitespace.match(template_str, start).group()
+    return _indent_value(whitespace, value)
+
+
+_braced_key = re.compile(r'\$\{([^}]*)\}')
+"""
+Matches the ${key} placeholders of a :class:`string.Template`
+"""
 
 
 def subs_at_indent(template_str, **kwargs):
@@ -790,9 +807,24 @@ def subs_at_indent(template_str, **kwargs):
         The formatted string
     """
 
+    # find the indentation of all keys in a single pass over the template
+    indents = {}
+    for line in template_str.split('\n'):
+        for match in _braced_key.finditer(line):
+            key = match.group(1)
+            if key in kwargs and key not in indents:
+                indents[key] = _leading_whitespace.match(line).group()
+        if len(indents) == len(kwargs):
+            break
+
+    missing = [key for key in kwargs if key not in indents]
+    if missing:
+        raise Exception('Key {} not found in template: {}'.format(
+            '${{{key}}}'.format(key=missing[0]), template_str))
+
     return Template(template_str).safe_substitute(
-        **{key: _find_indent(template_str, '${{{key}}}'.format(key=key),
-                             value if isinstance(value, str) else str(value))
+        **{key: _indent_value(indents[key],
+                              value if isinstance(value, str) else str(value))
             for key, value in six.iteritems(kwargs)})
 
 